@@ -0,0 +1,123 @@
+import threading
+from concurrent.futures import Future
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that only track where a click came from; two URLs that
+# differ only in these point at the same article. Names that sites also use
+# to pick the content (id, cid, src, source, ref, ...) are kept, since
+# dropping them would give different articles the same key.
+TRACKING_PARAMS = {'fbclid', 'gclid', 'dclid', 'msclkid', 'igshid', 'yclid', '_ga'}
+TRACKING_PREFIXES = ('utm_', 'mc_')
+
+# Hosts that wrap the real article URL in a query parameter
+_REDIRECT_PARAMS = {'q', 'url', 'u'}
+
+
+def _unwrap_redirect(parts):
+    """The target URL of a google.com/url?q=... style redirect link, if it is one"""
+    host = parts.hostname or ''
+    if parts.path != '/url' or not (host == 'google.com' or host.endswith('.google.com')):
+        return None
+    for name, value in parse_qsl(parts.query):
+        if name in _REDIRECT_PARAMS and value.startswith(('http://', 'https://')):
+            return value
+    return None
+
+
+def canonical_url(url):
+    """
+    Normalize an article URL so copies of the same link compare equal
+
+    Unwraps Google redirect links, lowercases the scheme and host, drops
+    'www.', default ports, fragments, trailing slashes and tracking query
+    parameters, and sorts what is left of the query.
+
+    Args:
+        url (str): Article URL as found in search results or a feed
+
+    Returns:
+        str: Canonical form of the URL
+    """
+    parts = urlsplit(url.strip())
+    target = _unwrap_redirect(parts)
+    if target is not None:
+        parts = urlsplit(target)
+
+    scheme = parts.scheme.lower() or 'https'
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if parts.port and (scheme, parts.port) not in (('http', 80), ('https', 443)):
+        host = f"{host}:{parts.port}"
+
+    path = parts.path.rstrip('/') or '/'
+    query = sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if name.lower() not in TRACKING_PARAMS and not name.lower().startswith(TRACKING_PREFIXES)
+    )
+    return urlunsplit((scheme, host, path, urlencode(query), ''))
+
+
+class ArticleRegistry:
+    """
+    Run-scoped record of per-article work, keyed by canonical URL
+
+    When several tickers reference the same article in one run, the first
+    caller does the work (download, extraction, condensation) and everyone
+    else gets its result; callers arriving while it is still in flight wait
+    for it instead of repeating it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._futures = {}
+        self._aliases = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, stage, url):
+        """Registry key for a stage of an article (call with _lock held)"""
+        canonical = canonical_url(url)
+        return stage, self._aliases.get(canonical, canonical)
+
+    def get(self, stage, url, compute):
+        """
+        Result of compute() for this stage of the article, computed once per run
+
+        Args:
+            stage (str): Kind of work, e.g. 'extract' or 'condense'
+            url (str): Article URL, in any of its tracking or redirect forms
+            compute (callable): Does the work; called only by the first caller
+
+        Returns:
+            The value compute() returned for the first caller. If it raised,
+            every caller gets the same exception.
+        """
+        with self._lock:
+            key = self._key(stage, url)
+            future = self._futures.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._futures[key] = future
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            value = compute()
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        future.set_result(value)
+        return value
+
+    def alias(self, url, final_url):
+        """Record that url redirected to final_url, so links to either share results"""
+        with self._lock:
+            source, target = canonical_url(url), canonical_url(final_url)
+            if source != target:
+                self._aliases.setdefault(target, self._aliases.get(source, source))
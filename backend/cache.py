@@ -0,0 +1,158 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from backend import metrics
+
+# Location and size of the on-disk cache
+CACHE_DIR = os.getenv(
+    'NEWS2SENTIMENT_CACHE_DIR',
+    os.path.join(os.path.expanduser('~'), '.cache', 'news2sentiment')
+)
+CACHE_MAX_BYTES = int(os.getenv('NEWS2SENTIMENT_CACHE_MAX_MB', '256')) * 1024 * 1024
+CACHE_ENABLED = os.getenv('NEWS2SENTIMENT_CACHE', '1') != '0'
+
+# After an eviction the cache is trimmed to this fraction of the limit
+EVICT_TO_FRACTION = 0.9
+
+_conn = None
+_conn_lock = threading.Lock()
+_total_bytes = 0
+
+def text_hash(*parts):
+    """Stable SHA-256 hex digest of one or more strings"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+def _connect():
+    """Open the cache database on first use (call with _conn_lock held)"""
+    global _conn, _total_bytes
+    if _conn is None:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        conn = sqlite3.connect(os.path.join(CACHE_DIR, 'cache.sqlite3'), check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)')
+        conn.commit()
+        _total_bytes = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        _conn = conn
+    return _conn
+
+def get(namespace, key, ttl=None, default=None):
+    """
+    Look up a cached value
+
+    Args:
+        namespace (str): Kind of value, e.g. 'article' or 'condensed'
+        key (str): Key within the namespace
+        ttl (float): Maximum age in seconds, or None for no expiry
+        default: Returned when the key is missing or expired
+
+    Returns:
+        The cached value, or default
+    """
+    global _total_bytes
+    if not CACHE_ENABLED:
+        return default
+
+    with _conn_lock:
+        conn = _connect()
+        row = conn.execute(
+            'SELECT value, size, created_at FROM entries WHERE namespace = ? AND key = ?',
+            (namespace, key)
+        ).fetchone()
+        if row is None:
+            metrics.increment('cache_requests', namespace=namespace, result='miss')
+            return default
+
+        value, size, created_at = row
+        now = time.time()
+        if ttl is not None and now - created_at > ttl:
+            conn.execute('DELETE FROM entries WHERE namespace = ? AND key = ?', (namespace, key))
+            conn.commit()
+            _total_bytes -= size
+            metrics.increment('cache_requests', namespace=namespace, result='expired')
+            return default
+
+        # Record the access for LRU eviction
+        conn.execute(
+            'UPDATE entries SET accessed_at = ? WHERE namespace = ? AND key = ?',
+            (now, namespace, key)
+        )
+        conn.commit()
+
+    metrics.increment('cache_requests', namespace=namespace, result='hit')
+    return pickle.loads(value)
+
+def put(namespace, key, value):
+    """
+    Store a value, evicting least recently used entries if the cache is full
+
+    Args:
+        namespace (str): Kind of value, e.g. 'article' or 'condensed'
+        key (str): Key within the namespace
+        value: Any picklable value
+    """
+    global _total_bytes
+    if not CACHE_ENABLED:
+        return
+
+    blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    now = time.time()
+
+    with _conn_lock:
+        conn = _connect()
+        previous = conn.execute(
+            'SELECT size FROM entries WHERE namespace = ? AND key = ?', (namespace, key)
+        ).fetchone()
+        conn.execute(
+            'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)',
+            (namespace, key, sqlite3.Binary(blob), len(blob), now, now)
+        )
+        _total_bytes += len(blob) - (previous[0] if previous else 0)
+
+        if _total_bytes > CACHE_MAX_BYTES:
+            _evict(conn, int(CACHE_MAX_BYTES * EVICT_TO_FRACTION))
+        conn.commit()
+
+def _evict(conn, target_bytes):
+    """Delete least recently used entries until the cache fits in target_bytes"""
+    global _total_bytes
+    rows = conn.execute('SELECT namespace, key, size FROM entries ORDER BY accessed_at')
+    doomed = []
+    for namespace, key, size in rows:
+        if _total_bytes <= target_bytes:
+            break
+        doomed.append((namespace, key))
+        _total_bytes -= size
+    conn.executemany('DELETE FROM entries WHERE namespace = ? AND key = ?', doomed)
+
+def clear(namespace=None):
+    """Remove every entry, or only the entries in one namespace"""
+    global _total_bytes
+    if not CACHE_ENABLED:
+        return
+
+    with _conn_lock:
+        conn = _connect()
+        if namespace is None:
+            conn.execute('DELETE FROM entries')
+        else:
+            conn.execute('DELETE FROM entries WHERE namespace = ?', (namespace,))
+        conn.commit()
+        _total_bytes = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
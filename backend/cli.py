@@ -0,0 +1,157 @@
+"""
+Run the full News2Sentiment pipeline over a list of tickers without the dashboard.
+
+    python -m backend.cli tickers.txt --workers 8 --output results.jsonl
+    python -m backend.cli tickers.txt --output results.parquet --start 2025-01-01
+
+The ticker file has one ticker per line (commas also work; '#' starts a
+comment). Results are written as each ticker finishes, and a per-stage
+timing summary is printed to stderr at the end.
+
+    python -m backend.cli tickers.txt --metrics run.prom --trace run.trace.json
+    python -m backend.cli tickers.txt --profile run.pstats
+
+--metrics writes span timings and cache/failure counters (Prometheus text, or
+JSON for a .json path), --trace a Chrome trace timeline of every span, and
+--profile a cProfile (or --profiler pyinstrument) profile of the run.
+"""
+import argparse
+import json
+import sys
+from contextlib import nullcontext
+from datetime import date, datetime, time, timedelta
+from backend import gemini_analysis, metrics, pipeline, sentiment
+
+
+def read_tickers(path):
+    """Tickers from a file, uppercased and de-duplicated in order"""
+    tickers = []
+    with open(path) as f:
+        for line in f:
+            line = line.split('#', 1)[0]
+            tickers.extend(ticker.strip().upper() for ticker in line.split(',') if ticker.strip())
+    return list(dict.fromkeys(tickers))
+
+
+class JsonlWriter:
+    """Write one JSON record per line, flushing after each"""
+
+    def __init__(self, path):
+        self.file = sys.stdout if path in (None, '-') else open(path, 'w')
+
+    def write(self, record):
+        self.file.write(json.dumps(record, default=str) + '\n')
+        self.file.flush()
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+
+class ParquetWriter:
+    """Write each record as its own row group so finished tickers are on disk immediately"""
+
+    def __init__(self, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.schema = pa.schema(
+            [
+                ('ticker', pa.string()), ('status', pa.string()), ('error', pa.string()),
+                ('last_price', pa.float64()), ('market_cap', pa.float64()), ('volume', pa.float64()),
+                ('articles_found', pa.int64()), ('articles_analyzed', pa.int64()),
+                ('final_score', pa.float64()), ('sentiment_label', pa.string()),
+                ('positive_count', pa.int64()), ('negative_count', pa.int64()),
+                ('neutral_count', pa.int64()), ('confidence', pa.float64()),
+                ('market_summary', pa.string()), ('articles', pa.string()),
+            ]
+            + [(f'time_{stage}', pa.float64()) for stage in pipeline.STAGES]
+        )
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, record):
+        self.writer.write_table(self.pa.Table.from_pylist([record], schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def _parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('tickers_file', help='File with one ticker per line')
+    parser.add_argument('--output', '-o', help='Output path (default: JSONL on stdout)')
+    parser.add_argument('--format', choices=['jsonl', 'parquet'],
+                        help='Output format (default: from the output extension, else jsonl)')
+    parser.add_argument('--workers', type=int, default=pipeline.DEFAULT_WORKERS,
+                        help='Tickers analyzed at the same time')
+    parser.add_argument('--start', type=_parse_date, default=date.today() - timedelta(days=20),
+                        help='First date of price history (YYYY-MM-DD)')
+    parser.add_argument('--end', type=_parse_date, default=date.today(),
+                        help='Last date of price history (YYYY-MM-DD)')
+    parser.add_argument('--full-text', action='store_true',
+                        help='Skip Gemini condensation and score full articles')
+    parser.add_argument('--local-only', action='store_true', default=gemini_analysis.LOCAL_ONLY,
+                        help='Condense and summarize locally without calling Gemini '
+                             '(default: on if GEMINI_LOCAL_ONLY=1)')
+    parser.add_argument('--metrics', help='Write span and counter metrics here (Prometheus text, or .json)')
+    parser.add_argument('--trace', help='Write a Chrome trace JSON timeline of all spans here')
+    parser.add_argument('--profile', help='Profile the run and write the result here')
+    parser.add_argument('--profiler', choices=['cprofile', 'pyinstrument'], default='cprofile')
+    args = parser.parse_args(argv)
+
+    output_format = args.format
+    if output_format is None:
+        output_format = 'parquet' if args.output and args.output.endswith('.parquet') else 'jsonl'
+    if output_format == 'parquet' and args.output in (None, '-'):
+        parser.error('--output is required for parquet output')
+
+    tickers = read_tickers(args.tickers_file)
+    writer = ParquetWriter(args.output) if output_format == 'parquet' else JsonlWriter(args.output)
+    # Load FinBERT before any ticker starts, rather than inside the first one's time budget
+    sentiment.warm_up()
+
+    totals = {stage: 0.0 for stage in pipeline.STAGES}
+    statuses = {}
+    profiling = metrics.profile(args.profile, args.profiler) if args.profile else nullcontext()
+    try:
+        with profiling:
+            results = pipeline.run_pipeline(
+                tickers,
+                datetime.combine(args.start, time.min),
+                datetime.combine(args.end, time.max),
+                max_workers=args.workers,
+                score_full_text=args.full_text,
+                local_only=args.local_only,
+            )
+            for result in results:
+                record = pipeline.result_to_record(result)
+                writer.write(record)
+
+                statuses[record['status']] = statuses.get(record['status'], 0) + 1
+                for stage in pipeline.STAGES:
+                    # Market data is one shared batch, so count it once
+                    if stage != 'market_data' and record[f'time_{stage}'] is not None:
+                        totals[stage] += record[f'time_{stage}']
+                totals['market_data'] = record['time_market_data'] or 0.0
+                print(f"{record['ticker']}: {record['status']}", file=sys.stderr)
+    finally:
+        writer.close()
+        if args.metrics:
+            metrics.write_metrics(args.metrics)
+        if args.trace:
+            metrics.write_timeline(args.trace)
+
+    print(f"\n{len(tickers)} tickers: " + ", ".join(f"{count} {status}" for status, count in statuses.items()),
+          file=sys.stderr)
+    print("Stage time (seconds, summed over tickers):", file=sys.stderr)
+    for stage in pipeline.STAGES:
+        print(f"  {stage:<18}{totals[stage]:10.2f}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
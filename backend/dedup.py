@@ -0,0 +1,183 @@
+import hashlib
+import math
+import re
+import threading
+import numpy as np
+
+# Syndicated wire stories show up under several outlets with the same or
+# lightly edited text. Articles are compared by MinHash signatures of their
+# word shingles, so each comparison is a cheap vector operation.
+NUM_PERMUTATIONS = 64
+SHINGLE_SIZE = 3
+
+# Estimated Jaccard similarity above which two articles count as one story.
+# In a short headline one word can flip the meaning ("rises" / "falls"), so
+# titles are compared as word pairs, which keep word order, with a stricter
+# bar than the extracted text. Copies whose outlets rewrote the headline are
+# still caught by their text once downloaded.
+TITLE_SHINGLE_SIZE = 2
+TITLE_THRESHOLD = 0.8
+TEXT_THRESHOLD = 0.7
+
+# Permutations are a * x + b mod a 31-bit prime, which stays within uint64
+_MERSENNE_PRIME = (1 << 31) - 1
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, _MERSENNE_PRIME, NUM_PERMUTATIONS).astype(np.uint64)
+_PERM_B = _rng.randint(0, _MERSENNE_PRIME, NUM_PERMUTATIONS).astype(np.uint64)
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _tokens(text):
+    return _WORD_RE.findall(text.lower())
+
+
+def _shingles(tokens, size):
+    if len(tokens) < size:
+        return {" ".join(tokens)} if tokens else set()
+    return {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def minhash(text, shingle_size=SHINGLE_SIZE):
+    """
+    MinHash signature of a text's word shingles
+
+    Args:
+        text (str): Title or article text
+        shingle_size (int): Words per shingle; 1 compares plain word sets
+
+    Returns:
+        ndarray: NUM_PERMUTATIONS uint64 values, or None if the text has no words
+    """
+    shingles = _shingles(_tokens(text or ""), shingle_size)
+    if not shingles:
+        return None
+
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") % _MERSENNE_PRIME
+         for s in shingles),
+        dtype=np.uint64, count=len(shingles),
+    )
+    permuted = (np.outer(hashes, _PERM_A) + _PERM_B) % _MERSENNE_PRIME
+    return permuted.min(axis=0)
+
+
+def similarity(signature_a, signature_b):
+    """Estimated Jaccard similarity of two MinHash signatures"""
+    if signature_a is None or signature_b is None:
+        return 0.0
+    return float(np.mean(signature_a == signature_b))
+
+
+def cluster_weight(cluster_size):
+    """
+    Weight of a story in the aggregate score given how many outlets carried it
+
+    Grows with the log of the cluster size, so a widely syndicated story counts
+    for more than a single report without drowning out everything else.
+    """
+    return 1.0 + math.log(max(cluster_size, 1))
+
+
+class DuplicateIndex:
+    """
+    Thread-safe set of representative articles, each with its cluster of duplicates
+
+    Articles are added as they become available; the first article of a story
+    becomes its representative and later near-duplicates join its cluster.
+    Articles added from several threads can be given ranks 0, 1, 2, ... so
+    that "first" means lowest rank rather than first to finish.
+    """
+
+    def __init__(self, threshold=TEXT_THRESHOLD):
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._ranked = threading.Condition(self._lock)
+        self._resolved = set()
+        self._signatures = {}
+        self._members = {}
+
+    def _wait_for_lower_ranks(self, rank, wait):
+        """Block until every rank below rank is added or skipped (call with _lock held)"""
+        self._ranked.wait_for(lambda: all(lower in self._resolved for lower in range(rank)), timeout=wait)
+
+    def _resolve(self, rank):
+        if rank is not None:
+            self._resolved.add(rank)
+            self._ranked.notify_all()
+
+    def add(self, key, signature, members=None, rank=None, wait=None):
+        """
+        Add an article, or join it to the cluster of an earlier near-duplicate
+
+        Args:
+            key (str): Article identifier, e.g. its URL
+            signature (ndarray): MinHash signature of the article
+            members (list): Keys of duplicates already folded into this article
+            rank (int): Position of the article; when given, it is only compared
+                once every lower rank has been added or skipped, so the lowest-
+                ranked copy of a story is always its representative
+            wait (float): Longest to wait for lower ranks, in seconds (None: no limit)
+
+        Returns:
+            str: Key of the representative it duplicates, or None if it is new
+        """
+        members = [key] + list(members or [])
+        with self._lock:
+            if rank is not None:
+                self._wait_for_lower_ranks(rank, wait)
+            try:
+                return self._add(key, signature, members)
+            finally:
+                self._resolve(rank)
+
+    def skip(self, rank):
+        """Record that the article at rank will not be added (e.g. it could not be downloaded)"""
+        with self._lock:
+            self._resolve(rank)
+
+    def _add(self, key, signature, members):
+        """Cluster an article against the representatives so far (call with _lock held)"""
+        if signature is not None:
+            for representative, existing in self._signatures.items():
+                if similarity(signature, existing) >= self.threshold:
+                    self._members[representative].extend(members)
+                    return representative
+        self._signatures[key] = signature
+        self._members[key] = members
+        return None
+
+    def cluster_size(self, key):
+        """Number of articles in a representative's cluster, itself included"""
+        with self._lock:
+            return len(self._members.get(key, [key]))
+
+    def duplicates(self, key):
+        """Keys of the articles folded into a representative"""
+        with self._lock:
+            return self._members.get(key, [key])[1:]
+
+
+def cluster_articles(articles, threshold=TITLE_THRESHOLD):
+    """
+    Collapse near-duplicate articles from fetch_news by title
+
+    Args:
+        articles (list): Articles with 'title' and 'url'
+        threshold (float): Similarity at which two titles are the same story
+
+    Returns:
+        list: One copy of the first article of each story, in input order,
+            with 'cluster_size' and 'duplicates' (URLs of the copies dropped)
+    """
+    index = DuplicateIndex(threshold)
+    representatives = []
+    for article in articles:
+        key = article.get("url") or article.get("title")
+        if index.add(key, minhash(article.get("title"), shingle_size=TITLE_SHINGLE_SIZE)) is None:
+            representatives.append((key, article))
+
+    return [
+        dict(article, cluster_size=index.cluster_size(key), duplicates=index.duplicates(key))
+        for key, article in representatives
+    ]
@@ -0,0 +1,92 @@
+import os
+import threading
+import onnxruntime as ort
+from transformers import AutoConfig, AutoTokenizer
+from backend import cache
+
+# Exported models live next to the on-disk cache unless configured otherwise
+ONNX_DIR = os.getenv('FINBERT_ONNX_DIR', os.path.join(cache.CACHE_DIR, 'onnx'))
+
+# Model inputs, in the order BertForSequenceClassification.forward takes them
+INPUT_NAMES = ['input_ids', 'attention_mask', 'token_type_ids']
+
+_export_lock = threading.Lock()
+
+def model_paths(model_id, output_dir=ONNX_DIR):
+    """Paths of the fp32 and int8 ONNX files for a model id"""
+    model_dir = os.path.join(output_dir, model_id.replace('/', '--'))
+    return os.path.join(model_dir, 'model.onnx'), os.path.join(model_dir, 'model.int8.onnx')
+
+def export_model(model_id, output_dir=ONNX_DIR, quantize=True):
+    """
+    Export a transformers sequence classifier to ONNX and quantize it to int8
+
+    Only needed once per model; PyTorch is required for the export but not
+    for running the exported model.
+
+    Args:
+        model_id (str): Hugging Face model id, e.g. 'ProsusAI/finbert'
+        output_dir (str): Directory to write the ONNX files to
+        quantize (bool): Also write a copy with int8 dynamic quantization
+
+    Returns:
+        str: Path of the model to run (int8 if quantized, else fp32)
+    """
+    import torch
+    from transformers import AutoModelForSequenceClassification
+
+    fp32_path, int8_path = model_paths(model_id, output_dir)
+    os.makedirs(os.path.dirname(fp32_path), exist_ok=True)
+
+    model = AutoModelForSequenceClassification.from_pretrained(model_id).eval()
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    dummy = tokenizer(["Shares rose after earnings."], return_tensors='pt')
+
+    # Batch and sequence dimensions stay dynamic so any padded batch can be fed
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in INPUT_NAMES}
+    dynamic_axes['logits'] = {0: 'batch'}
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(dummy[name] for name in INPUT_NAMES),
+            fp32_path,
+            input_names=INPUT_NAMES,
+            output_names=['logits'],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+        )
+
+    if not quantize:
+        return fp32_path
+
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    return int8_path
+
+class OnnxEngine:
+    """FinBERT running in onnxruntime, exported on first use"""
+
+    name = 'onnx'
+
+    def __init__(self, model_id, quantized=True, output_dir=ONNX_DIR):
+        fp32_path, int8_path = model_paths(model_id, output_dir)
+        path = int8_path if quantized else fp32_path
+        with _export_lock:
+            if not os.path.exists(path):
+                export_model(model_id, output_dir, quantize=quantized)
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_id)
+        self.id2label = AutoConfig.from_pretrained(model_id).id2label
+        self.session = ort.InferenceSession(path, providers=['CPUExecutionProvider'])
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+
+    def logits(self, batch):
+        """Class logits for a padded batch of numpy inputs"""
+        feed = {}
+        for name in self.input_names:
+            if name in batch:
+                feed[name] = batch[name].astype('int64')
+            else:
+                # The tokenizer's pad() doesn't always return token_type_ids
+                feed[name] = batch['input_ids'].astype('int64') * 0
+        return self.session.run(['logits'], feed)[0]
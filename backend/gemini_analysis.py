@@ -1,48 +1,338 @@
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
 from newspaper import Article
+import asyncio
 import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+import numpy as np
 from dotenv import load_dotenv
+from backend import cache, dedup, http_client, metrics
+from backend.article_registry import canonical_url
 
 # Load environment variables
 load_dotenv()
 
 # Configure Gemini
+GEMINI_MODEL_NAME = 'gemini-2.0-flash-lite'
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 if GEMINI_API_KEY:
     genai.configure(api_key=GEMINI_API_KEY)
-    model = genai.GenerativeModel('gemini-2.0-flash-lite')
+    model = genai.GenerativeModel(GEMINI_MODEL_NAME)
 else:
     print("Warning: GEMINI_API_KEY not found in environment variables")
     model = None
 
-def extract_article_content(url):
-    """Extract article content using newspaper3k"""
+# Concurrency limits for downloading and condensing articles
+MAX_WORKERS = 8          # Articles processed at once overall
+MAX_PER_HOST = 2         # Articles downloaded at once from the same site
+ARTICLE_TIMEOUT = 10     # Seconds allowed for a single article download
+PROCESS_TIMEOUT = 60     # Seconds allowed for one article end to end
+
+# How long extracted and condensed articles stay in the on-disk cache
+ARTICLE_CACHE_TTL = 7 * 24 * 3600      # Extracted content, keyed by URL
+CONDENSED_CACHE_TTL = 30 * 24 * 3600   # Gemini output, keyed by a hash of the prompt
+
+# Market summaries are kept per ticker and updated from the articles that
+# changed; after this many updates in a row one is rebuilt from scratch so
+# the text doesn't drift
+SUMMARY_STATE_TTL = 7 * 24 * 3600
+SUMMARY_MAX_UPDATES = 5
+# Article text that fits in one summary prompt; larger sets are map-reduced
+# through per-article digests of at most DIGEST_WORDS words
+SUMMARY_PROMPT_TOKEN_BUDGET = 6000
+DIGEST_WORDS = 80
+
+# Token budgets for the local extractive summarizer, which picks an article's
+# most informative sentences instead of cutting the text off at a fixed length
+CHARS_PER_TOKEN = 4            # Rough size of a token in English text
+CONDENSE_TOKEN_BUDGET = 1000   # Article text sent to Gemini for condensation
+LOCAL_TOKEN_BUDGET = 384       # Extract scored directly by FinBERT (512-token window)
+KEY_POINT_TOKEN_BUDGET = 60    # Per-article key point in a local market summary
+
+# Set GEMINI_LOCAL_ONLY=1 to condense and summarize locally by default, without
+# calling Gemini (e.g. when the API is slow or over quota)
+LOCAL_ONLY = os.getenv('GEMINI_LOCAL_ONLY', '0') == '1'
+
+# Gemini request limits, sized to the API quota (0 requests per minute: no rate limit)
+GEMINI_REQUESTS_PER_MINUTE = int(os.getenv('GEMINI_REQUESTS_PER_MINUTE', '30'))
+GEMINI_MAX_IN_FLIGHT = int(os.getenv('GEMINI_MAX_IN_FLIGHT', '4'))
+GEMINI_MAX_RETRIES = 4
+GEMINI_BACKOFF_BASE = 1.0    # Seconds before the first retry (before jitter)
+GEMINI_BACKOFF_MAX = 30.0    # Upper bound on a single backoff sleep
+
+# Errors worth retrying: quota exhaustion and transient server failures
+RETRYABLE_GEMINI_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+)
+
+_host_semaphores = {}
+_host_semaphores_lock = threading.Lock()
+
+class _TokenBucket:
+    """
+    Async token bucket allowing `rate_per_minute` requests with bursts up to `capacity`
+    
+    A rate of 0 means no limit.
+    """
+    
+    def __init__(self, rate_per_minute, capacity):
+        if rate_per_minute < 0:
+            raise ValueError(f"Gemini rate limit must be 0 (unlimited) or more requests per minute, "
+                             f"got {rate_per_minute}")
+        if capacity < 1:
+            raise ValueError(f"Gemini burst capacity must be at least 1 request, got {capacity}")
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+    
+    async def acquire(self):
+        if self.rate == 0:
+            return
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+# All Gemini calls run on one background event loop so the rate limit,
+# in-flight cap and request coalescing are shared by every thread and session
+_gemini_loop = None
+_gemini_loop_lock = threading.Lock()
+_gemini_bucket = None
+_gemini_semaphore = None
+_gemini_pending = {}
+
+def _get_gemini_loop():
+    """Start the background Gemini event loop on first use"""
+    global _gemini_loop, _gemini_bucket, _gemini_semaphore
+    with _gemini_loop_lock:
+        if _gemini_loop is None:
+            # Checked before the loop starts, so a bad setting fails every call the same way
+            bucket = _TokenBucket(GEMINI_REQUESTS_PER_MINUTE, GEMINI_MAX_IN_FLIGHT)
+            loop = asyncio.new_event_loop()
+            
+            async def create_semaphore():
+                return asyncio.Semaphore(GEMINI_MAX_IN_FLIGHT)
+            
+            threading.Thread(target=loop.run_forever, name="gemini-client", daemon=True).start()
+            _gemini_bucket = bucket
+            _gemini_semaphore = asyncio.run_coroutine_threadsafe(create_semaphore(), loop).result()
+            _gemini_loop = loop
+        return _gemini_loop
+
+async def _generate_with_retry(prompt):
+    """Call Gemini under the rate limit, retrying transient failures with jittered backoff"""
+    for attempt in range(GEMINI_MAX_RETRIES + 1):
+        await _gemini_bucket.acquire()
+        try:
+            async with _gemini_semaphore:
+                with metrics.span('gemini_request', attempt=attempt):
+                    response = await model.generate_content_async(prompt)
+            return response.text
+        except RETRYABLE_GEMINI_ERRORS as e:
+            if attempt == GEMINI_MAX_RETRIES:
+                raise
+            metrics.increment('gemini_retries', reason=type(e).__name__)
+            # Full jitter keeps simultaneous retries from hitting the quota together
+            backoff = min(GEMINI_BACKOFF_MAX, GEMINI_BACKOFF_BASE * 2 ** attempt)
+            await asyncio.sleep(random.uniform(0, backoff))
+
+async def _generate_coalesced(prompt):
+    """Share one Gemini call between identical prompts issued at the same time"""
+    task = _gemini_pending.get(prompt)
+    if task is None:
+        task = asyncio.ensure_future(_generate_with_retry(prompt))
+        _gemini_pending[prompt] = task
+        task.add_done_callback(lambda _: _gemini_pending.pop(prompt, None))
+    # Shield so one caller giving up doesn't cancel the call for the others
+    return await asyncio.shield(task)
+
+def _submit_prompt(prompt):
+    """Schedule a prompt on the Gemini loop and return a concurrent.futures.Future"""
+    return asyncio.run_coroutine_threadsafe(_generate_coalesced(prompt), _get_gemini_loop())
+
+async def generate_content_async(prompt):
+    """Generate text for a prompt with Gemini from any asyncio event loop"""
+    return await asyncio.wrap_future(_submit_prompt(prompt))
+
+def generate_content(prompt):
+    """Generate text for a prompt with Gemini, blocking until the response arrives"""
+    return _submit_prompt(prompt).result()
+
+def _host_semaphore(url):
+    """Get the semaphore limiting concurrent downloads from the URL's host"""
+    host = urlparse(url).netloc.lower()
+    with _host_semaphores_lock:
+        if host not in _host_semaphores:
+            _host_semaphores[host] = threading.BoundedSemaphore(MAX_PER_HOST)
+        return _host_semaphores[host]
+
+@metrics.traced('extract_article_content')
+def extract_article_content(url, timeout=ARTICLE_TIMEOUT):
+    """Extract article content using newspaper3k (cached by canonical URL)"""
+    cache_key = canonical_url(url)
+    cached = cache.get('article', cache_key, ttl=ARTICLE_CACHE_TTL)
+    if cached is not None:
+        return cached
+    
     try:
-        article = Article(url)
-        article.download()
+        # Download through the shared pooled session instead of newspaper3k's own
+        response = http_client.get(url, timeout=timeout)
+        article = Article(response.url)
+        article.download(input_html=response.text)
         article.parse()
         
         if not article.text or len(article.text.strip()) < 100:
+            metrics.count_failure('extract_article_content', 'too_short')
             return None
-        return {
+        content_data = {
             'title': article.title,
             'text': article.text,
             'summary': article.summary,
             'authors': article.authors,
             'publish_date': article.publish_date,
-            'top_image': article.top_image
+            'top_image': article.top_image,
+            'url': response.url  # After redirects
         }
+        cache.put('article', cache_key, content_data)
+        return content_data
     except Exception as e:
+        metrics.count_failure('extract_article_content', e)
         return None
 
-def condense_with_gemini(title, content, max_chars=4000):
-    """Condense article content with Gemini to 350 words max"""
+# Sentence boundaries: end punctuation followed by what looks like a new sentence
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+(?=["\'(\[]?[A-Z0-9$])')
+_WORD_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+# Words too common to say what a sentence is about
+_STOPWORDS = frozenset("""
+a about after also an and are as at be been but by can could for from had has have he her his
+i if in into is it its it's more most not of on or our over said says she so than that the their
+them then there these they this to up was we were what when which while who will with would you
+""".split())
+
+# How much a sentence's similarity to the headline and its position in the
+# article add to its TextRank score (normalized to at most 1)
+TITLE_WEIGHT = 0.5
+LEAD_WEIGHT = 0.2
+
+def _estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def _truncate_to_budget(text, token_budget):
+    """Cut text to the budget at a word boundary"""
+    limit = token_budget * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(' ', 1)[0]
+
+def _split_sentences(text):
+    sentences = []
+    for paragraph in text.splitlines():
+        sentences.extend(s.strip() for s in _SENTENCE_SPLIT_RE.split(paragraph.strip()) if s.strip())
+    return sentences
+
+def _tfidf_vectors(texts, n_documents):
+    """
+    L2-normalized TF-IDF rows for texts, with IDF taken from the first n_documents
+    
+    Term frequencies are sublinear (log1p of the count) so one repeated word
+    doesn't dominate a sentence.
+    """
+    vocabulary = {}
+    rows, columns = [], []
+    for row, text in enumerate(texts):
+        for word in _WORD_RE.findall(text.lower()):
+            if word not in _STOPWORDS:
+                rows.append(row)
+                columns.append(vocabulary.setdefault(word, len(vocabulary)))
+    
+    counts = np.zeros((len(texts), len(vocabulary)))
+    np.add.at(counts, (np.array(rows, dtype=np.intp), np.array(columns, dtype=np.intp)), 1)
+    document_frequency = np.count_nonzero(counts[:n_documents], axis=0)
+    idf = np.log((1 + n_documents) / (1 + document_frequency)) + 1
+    weights = np.log1p(counts) * idf
+    norms = np.linalg.norm(weights, axis=1, keepdims=True)
+    return weights / np.where(norms == 0, 1, norms)
+
+def _textrank(vectors, damping=0.85, iterations=30):
+    """TextRank centrality of sentences from their pairwise cosine similarity"""
+    n = len(vectors)
+    similarity = vectors @ vectors.T
+    np.fill_diagonal(similarity, 0)
+    totals = similarity.sum(axis=1, keepdims=True)
+    transition = np.divide(similarity, totals, out=np.zeros_like(similarity), where=totals > 0)
+    scores = np.full(n, 1.0 / n)
+    for _ in range(iterations):
+        scores = (1 - damping) / n + damping * (transition.T @ scores)
+    return scores
+
+def extractive_summary(text, token_budget=CONDENSE_TOKEN_BUDGET, title=None):
+    """
+    Pick an article's most informative sentences that fit in a token budget
+    
+    Sentences are ranked by TextRank over their TF-IDF vectors, boosted by
+    similarity to the title and by how early they appear, then taken greedily
+    in rank order while they fit. Runs locally in a few milliseconds.
+    
+    Args:
+        text (str): Extracted article text
+        token_budget (int): Approximate number of tokens to keep
+        title (str): Article title, if known
+    
+    Returns:
+        str: The chosen sentences in their original order, or the text itself
+            if it already fits the budget
+    """
+    text = (text or "").strip()
+    if _estimate_tokens(text) <= token_budget:
+        return text
+    
+    # Repeated sentences (pull quotes, captions) are only worth keeping once
+    sentences = list(dict.fromkeys(_split_sentences(text)))
+    if len(sentences) < 2:
+        return _truncate_to_budget(text, token_budget)
+    
+    n = len(sentences)
+    vectors = _tfidf_vectors(sentences + ([title] if title else []), n)
+    scores = _textrank(vectors[:n])
+    scores /= scores.max()
+    if title:
+        scores += TITLE_WEIGHT * (vectors[:n] @ vectors[n])
+    # News leads with the key facts
+    scores += LEAD_WEIGHT * (1 - np.arange(n) / n)
+    
+    lengths = [_estimate_tokens(sentence) + 1 for sentence in sentences]
+    selected, used = [], 0
+    for index in np.argsort(-scores, kind='stable'):
+        if used + lengths[index] <= token_budget:
+            selected.append(index)
+            used += lengths[index]
+    if not selected:
+        return _truncate_to_budget(sentences[int(np.argmax(scores))], token_budget)
+    return ' '.join(sentences[index] for index in sorted(selected))
+
+@metrics.traced('condense_with_gemini')
+def condense_with_gemini(title, content, token_budget=CONDENSE_TOKEN_BUDGET):
+    """Condense article content with Gemini to 350 words max (cached by content hash)"""
     if not model:
         return "Gemini API key not configured"
     
     try:
-        # Limit content to avoid token limits
-        content_preview = content[:max_chars] if content else ""
+        # Send only the most informative sentences that fit the token budget
+        content_preview = extractive_summary(content, token_budget, title)
         
         prompt = f"""
         Condense this news article to exactly 350 words or less while preserving all key information:
@@ -61,46 +351,242 @@ def condense_with_gemini(title, content, max_chars=4000):
         Return only the condensed article text.
         """
         
-        response = model.generate_content(prompt)
-        return response.text
+        # The prompt contains the extracted text, so its hash addresses the content
+        cache_key = cache.text_hash(GEMINI_MODEL_NAME, prompt)
+        condensed = cache.get('condensed', cache_key, ttl=CONDENSED_CACHE_TTL)
+        if condensed is None:
+            condensed = generate_content(prompt)
+            cache.put('condensed', cache_key, condensed)
+        return condensed
     except Exception as e:
+        metrics.count_failure('condense_with_gemini', e)
         return f"Condensation failed: {str(e)}"
 
-def process_articles_with_gemini(articles):
-    """Process articles from fetch_news and return condensed versions"""
-    if not articles:
-        return []
+def _shared(registry, stage, url, compute):
+    """Run compute() through the run's ArticleRegistry, if there is one"""
+    if registry is None:
+        return compute()
+    return registry.get(stage, url, compute)
+
+def _process_single_article(article, condense=True, dedup_index=None, registry=None, local_only=False, rank=None):
+    """
+    Download, extract and (optionally) condense one article from fetch_news
     
-    condensed_articles = []
+    rank is the article's position among the articles sharing dedup_index;
+    see dedup.DuplicateIndex.add.
+    """
+    url = article['url']
     
-    for i, article in enumerate(articles):
-        url = article['url']
-        title = article['title']
-        published_at = article['published_at']
-        
-        # Extract content
-        content_data = extract_article_content(url)
+    def extract():
+        # Limit how many downloads hit the same site at once
+        with _host_semaphore(url):
+            return extract_article_content(url)
+    
+    ranked = False
+    try:
+        # Articles referenced by several tickers in one run are extracted once
+        content_data = _shared(registry, 'extract', url, extract)
+        if not content_data:
+            return None
+        if registry is not None and content_data.get('url'):
+            registry.alias(url, content_data['url'])
         
-        if content_data:
-            # Condense with Gemini
-            condensed_content = condense_with_gemini(content_data['title'], content_data['text'])
+        # Syndicated copies of a story are condensed once, for the copy ranked first
+        if dedup_index is not None:
+            signature = dedup.minhash(content_data['text'])
+            ranked = True
+            if dedup_index.add(url, signature, article.get('duplicates'), rank, wait=PROCESS_TIMEOUT) is not None:
+                return None
+    finally:
+        # Articles ranked after this one no longer wait for it
+        if dedup_index is not None and rank is not None and not ranked:
+            dedup_index.skip(rank)
+    
+    # Condense with Gemini, unless the full text will be scored directly. In
+    # local-only mode the extract is short enough for FinBERT as it is.
+    condensed_content = None
+    if condense and local_only:
+        condensed_content = extractive_summary(content_data['text'], LOCAL_TOKEN_BUDGET, content_data['title'])
+    elif condense:
+        condensed_content = _shared(
+            registry, 'condense', url,
+            lambda: condense_with_gemini(content_data['title'], content_data['text'])
+        )
+    
+    return {
+        'title': content_data['title'],
+        'condensed_content': condensed_content,
+        'text': content_data['text'],
+        'summary': content_data['summary'],
+        'authors': content_data['authors'],
+        'publish_date': content_data['publish_date'],
+        'top_image': content_data['top_image'],
+        'url': url,
+        'published_at': article['published_at']
+    }
+
+def iter_articles_with_gemini(articles, max_workers=MAX_WORKERS, timeout=PROCESS_TIMEOUT, condense=True,
+                              dedup_index=None, registry=None, local_only=False):
+    """
+    Process articles from fetch_news concurrently, yielding each one as soon as it is ready
+    
+    Yields (index, condensed_article) pairs in completion order, where index is the
+    article's position in `articles`. Articles that can't be extracted are skipped,
+    and so is anything still running when the time budget (timeout per round of
+    max_workers articles) runs out. Time the caller spends between items, such
+    as scoring them, does not count against the budget.
+    
+    With a dedup.DuplicateIndex, articles whose extracted text nearly matches an
+    earlier article in `articles` are skipped too and recorded in that article's
+    cluster, so the copy kept does not depend on which download finished first.
+    With an article_registry.ArticleRegistry, articles already handled for another
+    ticker in the same run reuse that work.
+    
+    With local_only=True articles are condensed by extractive_summary instead
+    of Gemini, so no API calls are made.
+    """
+    if not articles:
+        return
+    
+    workers = min(max_workers, len(articles))
+    rounds = -(-len(articles) // workers)
+    
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = {
+            executor.submit(_process_single_article, article, condense, dedup_index, registry, local_only, index): index
+            for index, article in enumerate(articles)
+        }
+        pending = set(futures)
+        deadline = time.monotonic() + timeout * rounds
+        while pending:
+            done, pending = wait(pending, timeout=max(0, deadline - time.monotonic()),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                for future in pending:
+                    future.cancel()
+                break
             
-            # Add to results
-            condensed_articles.append({
-                'title': content_data['title'],
-                'condensed_content': condensed_content,
-                'summary': content_data['summary'],
-                'authors': content_data['authors'],
-                'publish_date': content_data['publish_date'],
-                'top_image': content_data['top_image'],
-                'url': url,
-                'published_at': published_at
-            })
-    
-    return condensed_articles
-
-def generate_market_summary(condensed_articles, ticker):
-    """Generate market summary using condensed articles"""
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception:
+                    continue
+                
+                if result:
+                    suspended = time.monotonic()
+                    yield futures[future], result
+                    deadline += time.monotonic() - suspended
+    finally:
+        # Don't block on downloads that already timed out
+        executor.shutdown(wait=False)
+
+def process_articles_with_gemini(articles, max_workers=MAX_WORKERS, timeout=PROCESS_TIMEOUT, condense=True,
+                                 dedup_index=None, registry=None, local_only=False):
+    """
+    Process articles from fetch_news concurrently and return condensed versions in input order
+    
+    With condense=False the Gemini step is skipped: 'condensed_content' is None and
+    callers score the full 'text' instead (see calculate_final_sentiment_score).
+    With local_only=True 'condensed_content' is a local extract instead.
+    """
+    processed = sorted(iter_articles_with_gemini(articles, max_workers, timeout, condense, dedup_index, registry,
+                                                 local_only),
+                       key=lambda item: item[0])
+    return [condensed_article for _, condensed_article in processed]
+
+_SUMMARY_INSTRUCTIONS = """Please provide:
+1. **Overall Market Sentiment** (Positive/Negative/Neutral)
+2. **Key Themes** (3-5 main topics driving the news)
+3. **Market Impact** (How these developments might affect {ticker} stock)
+4. **Risk Factors** (Any potential concerns or challenges mentioned)
+5. **Investment Outlook** (Short-term and medium-term perspective)
+
+Format your response clearly with headers for each section. Be concise but comprehensive."""
+
+def _summary_entry(article):
+    """Key, content hash, title and prompt content of an article in a market summary"""
+    # Fall back to an extract of the full text when condensation was skipped
+    content = article.get('condensed_content') or extractive_summary(article.get('text', ''),
+                                                                     title=article['title'])
+    key = canonical_url(article['url']) if article.get('url') else cache.text_hash(article['title'])
+    return key, cache.text_hash(article['title'], content), article['title'], content
+
+def _generate_all(prompts):
+    """Responses to several prompts, from the 'digest' cache or Gemini in parallel"""
+    responses = {}
+    pending = {}
+    for index, prompt in enumerate(prompts):
+        key = cache.text_hash(GEMINI_MODEL_NAME, prompt)
+        response = cache.get('digest', key, ttl=CONDENSED_CACHE_TTL)
+        if response is None:
+            pending[index] = key, _submit_prompt(prompt)
+        else:
+            responses[index] = response
+    for index, (key, future) in pending.items():
+        responses[index] = future.result()
+        cache.put('digest', key, responses[index])
+    return [responses[index] for index in range(len(prompts))]
+
+def _article_digests(entries, ticker):
+    """Map step: a short digest of each article, cached by its content"""
+    prompts = [
+        '\n'.join([
+            f"Summarize what this news article says about {ticker} in at most {DIGEST_WORDS} words.",
+            "Keep figures, guidance and anything that moves the stock. Return only the summary.",
+            "",
+            f"Title: {title}",
+            f"Content: {content}",
+        ])
+        for _, _, title, content in entries
+    ]
+    digests = _generate_all(prompts)
+    return [f"Title: {title}\nDigest: {digest}" for (_, _, title, _), digest in zip(entries, digests)]
+
+def _combine_notes(sections, ticker, token_budget):
+    """Reduce step: merge sections in groups that fit a prompt until all of them fit one"""
+    while len(sections) > 1 and sum(_estimate_tokens(section) for section in sections) > token_budget:
+        groups, group, used = [], [], 0
+        for section in sections:
+            tokens = _estimate_tokens(section)
+            if group and used + tokens > token_budget:
+                groups.append(group)
+                group, used = [], 0
+            group.append(section)
+            used += tokens
+        groups.append(group)
+        
+        prompts = [
+            '\n\n'.join([
+                f"Combine these notes on news about {ticker} into one set of notes of at most "
+                f"{DIGEST_WORDS * 2} words. Keep figures, themes, risks and the overall tone.",
+                *group,
+            ])
+            for group in groups
+        ]
+        sections = [f"Notes: {notes}" for notes in _generate_all(prompts)]
+    return sections
+
+def _summary_sections(entries, ticker, token_budget):
+    """Article sections for a summary prompt, map-reduced if they don't fit the budget"""
+    sections = [f"--- Article {i + 1} ---\nTitle: {title}\nContent: {content}"
+                for i, (_, _, title, content) in enumerate(entries)]
+    if sum(_estimate_tokens(section) for section in sections) <= token_budget:
+        return sections, 'full'
+    return _combine_notes(_article_digests(entries, ticker), ticker, token_budget), 'map_reduce'
+
+@metrics.traced('generate_market_summary')
+def generate_market_summary(condensed_articles, ticker, incremental=True):
+    """
+    Generate market summary using condensed articles
+    
+    The summary and the articles it covered are kept per ticker. With
+    incremental=True, a later call with the same articles returns it without
+    calling Gemini, and a call with some new or changed articles sends only
+    those together with the previous summary. Article sets too large for one
+    prompt are digested one article at a time and the digests combined
+    (map-reduce).
+    """
     if not model:
         return "Gemini API key not configured"
     
@@ -108,29 +594,72 @@ def generate_market_summary(condensed_articles, ticker):
         return "No articles available for analysis"
     
     try:
-        # Prepare articles text for analysis
-        articles_text = ""
-        for i, article in enumerate(condensed_articles):
-            articles_text += f"\n--- Article {i+1} ---\n"
-            articles_text += f"Title: {article['title']}\n"
-            articles_text += f"Content: {article['condensed_content']}\n"
-        
-        prompt = f"""
-        Based on the following news articles about {ticker}, generate a comprehensive market summary:
+        entries = [_summary_entry(article) for article in condensed_articles]
+        current = {key for key, _, _, _ in entries}
+        state_key = cache.text_hash(GEMINI_MODEL_NAME, ticker)
+        state = cache.get('market_summary', state_key, ttl=SUMMARY_STATE_TTL) if incremental else None
         
-        {articles_text}
+        summary = None
+        updates = 0
+        if state is not None and state['updates'] < SUMMARY_MAX_UPDATES:
+            changed = [entry for entry in entries if state['articles'].get(entry[0]) != entry[1]]
+            removed = [title for key, title in state['titles'].items() if key not in current]
+            if not changed and not removed:
+                metrics.increment('market_summaries', mode='reused')
+                return state['summary']
+            # Worth it only if some of the previous summary still applies
+            if len(changed) < len(entries):
+                budget = max(SUMMARY_PROMPT_TOKEN_BUDGET - _estimate_tokens(state['summary']),
+                             SUMMARY_PROMPT_TOKEN_BUDGET // 2)
+                sections, mode = _summary_sections(changed, ticker, budget)
+                lines = [
+                    f"Here is the current market summary for {ticker}:",
+                    "",
+                    state['summary'],
+                    "",
+                ]
+                if sections:
+                    lines += ["Since it was written, these articles were published or updated:", "", *sections, ""]
+                if removed:
+                    lines += ["These articles are no longer in the news set; drop anything that relied only on them:",
+                              *(f"- {title}" for title in removed), ""]
+                lines += [f"Update the market summary for {ticker} to reflect this, keeping the same structure.",
+                          _SUMMARY_INSTRUCTIONS.format(ticker=ticker)]
+                summary = generate_content('\n'.join(lines))
+                updates = state['updates'] + 1
+                metrics.increment('market_summaries', mode=f'incremental_{mode}')
         
-        Please provide:
-        1. **Overall Market Sentiment** (Positive/Negative/Neutral)
-        2. **Key Themes** (3-5 main topics driving the news)
-        3. **Market Impact** (How these developments might affect {ticker} stock)
-        4. **Risk Factors** (Any potential concerns or challenges mentioned)
-        5. **Investment Outlook** (Short-term and medium-term perspective)
-        
-        Format your response clearly with headers for each section. Be concise but comprehensive.
-        """
+        if summary is None:
+            sections, mode = _summary_sections(entries, ticker, SUMMARY_PROMPT_TOKEN_BUDGET)
+            prompt = '\n'.join([
+                f"Based on the following news articles about {ticker}, generate a comprehensive market summary:",
+                "",
+                *sections,
+                "",
+                _SUMMARY_INSTRUCTIONS.format(ticker=ticker),
+            ])
+            summary = generate_content(prompt)
+            metrics.increment('market_summaries', mode=mode)
         
-        response = model.generate_content(prompt)
-        return response.text
+        cache.put('market_summary', state_key, {
+            'summary': summary,
+            'articles': {key: content_hash for key, content_hash, _, _ in entries},
+            'titles': {key: title for key, _, title, _ in entries},
+            'updates': updates,
+        })
+        return summary
     except Exception as e:
+        metrics.count_failure('generate_market_summary', e)
         return f"Summary generation failed: {str(e)}"
+
+def local_market_summary(condensed_articles, ticker):
+    """Market summary made of each article's key point, built without Gemini"""
+    if not condensed_articles:
+        return "No articles available for analysis"
+    
+    lines = [f"**Key points for {ticker}** (extracted locally, without Gemini)", ""]
+    for article in condensed_articles:
+        content = article.get('condensed_content') or article.get('text', '')
+        key_point = extractive_summary(content, KEY_POINT_TOKEN_BUDGET, article['title'])
+        lines.append(f"- **{article['title']}**: {key_point}")
+    return "\n".join(lines)
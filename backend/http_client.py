@@ -0,0 +1,107 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlparse
+from backend import cache, metrics
+
+# Browser-like user agent; several news sites refuse the requests default
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/101.0.4951.54 Safari/537.36"
+
+DEFAULT_TIMEOUT = (5, 15)       # Seconds to connect, seconds between bytes read
+POOL_SIZE = 10                  # Keep-alive connections kept per host
+RESPONSE_CACHE_TTL = 7 * 24 * 3600  # How long a response is kept for revalidation
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+class HttpResponse:
+    """The parts of a response callers need, whether fresh or served from the cache"""
+
+    def __init__(self, url, status_code, content, headers, encoding, from_cache=False):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.encoding = encoding
+        self.from_cache = from_cache
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+def get_session(url):
+    """Get the pooled keep-alive session for the URL's host"""
+    host = urlparse(url).netloc.lower()
+    with _sessions_lock:
+        if host not in _sessions:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers['User-Agent'] = USER_AGENT
+            _sessions[host] = session
+        return _sessions[host]
+
+def get(url, headers=None, timeout=DEFAULT_TIMEOUT, revalidate=True):
+    """
+    GET a URL through the shared session for its host
+
+    When an earlier response carried an ETag or Last-Modified header the
+    request is made conditional, and a 304 reply is served from the local
+    response cache instead of downloading the body again.
+
+    Args:
+        url (str): URL to fetch
+        headers (dict): Extra request headers
+        timeout: Seconds, or a (connect, read) tuple
+        revalidate (bool): Use and update the local response cache
+
+    Returns:
+        HttpResponse: Response body and metadata
+
+    Raises:
+        requests.RequestException: On network errors and non-2xx responses
+    """
+    request_headers = dict(headers or {})
+
+    cached = cache.get('http', url, ttl=RESPONSE_CACHE_TTL) if revalidate else None
+    if cached:
+        if cached.get('etag'):
+            request_headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            request_headers['If-Modified-Since'] = cached['last_modified']
+
+    with metrics.span('http_get', host=urlparse(url).netloc):
+        response = get_session(url).get(url, headers=request_headers, timeout=timeout)
+
+    if response.status_code == 304 and cached:
+        metrics.increment('http_not_modified', host=urlparse(url).netloc)
+        return HttpResponse(
+            cached['url'], 200, cached['content'], cached['headers'], cached['encoding'], from_cache=True
+        )
+
+    response.raise_for_status()
+
+    # requests guesses ISO-8859-1 for text/* without a charset; prefer detection then
+    encoding = response.encoding
+    if not encoding or (encoding.lower() == 'iso-8859-1' and 'charset' not in response.headers.get('Content-Type', '')):
+        encoding = response.apparent_encoding
+
+    result = HttpResponse(
+        response.url, response.status_code, response.content, dict(response.headers), encoding
+    )
+
+    # Only responses with validators can be revalidated later
+    etag = response.headers.get('ETag')
+    last_modified = response.headers.get('Last-Modified')
+    if revalidate and (etag or last_modified):
+        cache.put('http', url, {
+            'url': result.url,
+            'content': result.content,
+            'headers': result.headers,
+            'encoding': result.encoding,
+            'etag': etag,
+            'last_modified': last_modified,
+        })
+
+    return result
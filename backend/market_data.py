@@ -0,0 +1,117 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import pandas as pd
+from backend import metrics, price_store
+
+# Metric lookups (market cap, volume) run at most this many at once
+MAX_METRIC_WORKERS = 8
+
+@metrics.traced('yfinance_download')
+def _yfinance_download(tickers, start, end):
+    """Download daily history for many tickers in one request; `end` is exclusive"""
+    import yfinance as yf
+    return yf.download(
+        tickers,
+        start=start,
+        end=end,
+        group_by='ticker',
+        auto_adjust=True,  # Same prices as Ticker.history
+        actions=True,      # Keep the Dividends / Stock Splits columns as well
+        threads=True,
+        progress=False,
+    )
+
+def _ticker_frame(frame, ticker):
+    """One ticker's bars out of a yf.download result"""
+    if isinstance(frame.columns, pd.MultiIndex):
+        if ticker not in frame.columns.get_level_values(0):
+            return pd.DataFrame()
+        frame = frame[ticker]
+    # Dates where only other tickers traded come back as all-NaN rows
+    return frame.dropna(how='all')
+
+def fetch_market_data(tickers, start, end, download=_yfinance_download,
+                      fetch_metrics=price_store._yfinance_metrics):
+    """
+    Price history and metrics for many tickers with as few requests as possible
+
+    Dates already in the local price store are not downloaded again; every
+    ticker still missing data is downloaded in one batched request covering
+    the union of their gaps. Market cap and volume are then looked up
+    concurrently.
+
+    Args:
+        tickers (list): Stock tickers
+        start (date or datetime): First date wanted
+        end (date or datetime): Last date wanted, inclusive
+        download (callable): download(tickers, start, end_exclusive) returning a
+            yf.download-style DataFrame; replace it to work offline
+        fetch_metrics (callable): Passed to price_store.get_metrics
+
+    Returns:
+        dict: ticker -> {'hist', 'last_price', 'market_cap', 'volume', 'error'}
+    """
+    errors = {}
+    gaps = {}
+    for ticker in tickers:
+        try:
+            gaps[ticker] = price_store.get_missing_ranges(ticker, start, end)
+        except Exception as e:
+            metrics.count_failure('market_data', e)
+            errors[ticker] = e
+    stale = [ticker for ticker in gaps if gaps[ticker]]
+
+    if stale:
+        span_start = min(gap_start for ticker in stale for gap_start, _ in gaps[ticker])
+        span_end = max(gap_end for ticker in stale for _, gap_end in gaps[ticker])
+        try:
+            frame = download(stale, span_start, span_end + timedelta(days=1))
+        except Exception as e:
+            metrics.count_failure('market_data', e)
+            frame = None
+            for ticker in stale:
+                errors[ticker] = e
+        if frame is not None:
+            for ticker in stale:
+                try:
+                    price_store.store_history(ticker, _ticker_frame(frame, ticker), span_start, span_end)
+                except Exception as e:
+                    metrics.count_failure('market_data', e)
+                    errors[ticker] = e
+
+    def load_metrics(ticker):
+        try:
+            return price_store.get_metrics(ticker, fetch_metrics)
+        except Exception as e:
+            errors.setdefault(ticker, e)
+            return {"market_cap": None, "volume": None}
+
+    workers = max(1, min(MAX_METRIC_WORKERS, len(tickers)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        ticker_metrics = dict(zip(tickers, executor.map(load_metrics, tickers)))
+
+    market_data = {}
+    for ticker in tickers:
+        try:
+            hist = price_store.read_history(ticker, start, end).reset_index()
+        except Exception as e:
+            metrics.count_failure('market_data', e)
+            errors.setdefault(ticker, e)
+            hist = pd.DataFrame()
+
+        # Last price from historical data
+        last_price = hist['Close'].iloc[-1] if not hist.empty else None
+
+        # Final fallback: if volume missing, use historical data
+        volume = ticker_metrics[ticker]["volume"]
+        if volume is None and not hist.empty:
+            volume = hist['Volume'].iloc[-1]
+
+        market_data[ticker] = {
+            "hist": hist,
+            "last_price": last_price,
+            "market_cap": ticker_metrics[ticker]["market_cap"],
+            "volume": volume,
+            "error": errors.get(ticker),
+        }
+    return market_data
@@ -0,0 +1,269 @@
+"""
+Lightweight, process-wide instrumentation for the pipeline.
+
+    with metrics.span('fetch_news', ticker='AAPL'):
+        ...
+
+    @metrics.traced('extract_article_content')
+    def extract_article_content(url): ...
+
+    metrics.increment('cache_requests', namespace='article', result='hit')
+
+Spans are summarized per name (count, total, max, errors) and kept in a
+bounded timeline; counters are keyed by name and labels. Export with
+to_prometheus() or write_timeline() (Chrome trace format, opens in
+chrome://tracing or https://ui.perfetto.dev).
+"""
+import cProfile
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Set NEWS2SENTIMENT_METRICS=0 to turn recording off entirely
+ENABLED = os.getenv('NEWS2SENTIMENT_METRICS', '1') != '0'
+
+# Most recent spans kept for the timeline
+TIMELINE_SIZE = 20000
+
+PROMETHEUS_PREFIX = 'news2sentiment'
+
+_lock = threading.Lock()
+_spans = {}
+_counters = {}
+_timeline = deque(maxlen=TIMELINE_SIZE)
+_thread_names = {}
+_epoch = time.perf_counter()
+
+def _record_span(name, started, finished, error, attrs):
+    duration = finished - started
+    thread = threading.current_thread()
+    with _lock:
+        stats = _spans.get(name)
+        if stats is None:
+            stats = _spans[name] = {'count': 0, 'total': 0.0, 'max': 0.0, 'errors': 0}
+        stats['count'] += 1
+        stats['total'] += duration
+        stats['max'] = max(stats['max'], duration)
+        if error is not None:
+            stats['errors'] += 1
+        _timeline.append((name, started - _epoch, duration, thread.ident, error, attrs))
+        _thread_names[thread.ident] = thread.name
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Time a block of code under `name`
+
+    An exception escaping the block is recorded as the span's error and
+    counted as a failure of `name`, then re-raised.
+    """
+    if not ENABLED:
+        yield
+        return
+
+    started = time.perf_counter()
+    error = None
+    try:
+        yield
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        _record_span(name, started, time.perf_counter(), error, attrs)
+        if error is not None:
+            increment('failures', stage=name, reason=error)
+
+def traced(name):
+    """Decorator running every call of a function inside span(name)"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def increment(name, value=1, **labels):
+    """Add value to the counter `name` with the given labels"""
+    if not ENABLED:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def count_failure(stage, error=None):
+    """
+    Count a failure that was handled rather than raised
+
+    Args:
+        stage (str): Where it happened, e.g. 'extract_article_content'
+        error (Exception or str): The exception, or a short reason
+    """
+    if isinstance(error, BaseException):
+        reason = type(error).__name__
+    else:
+        reason = error or 'unknown'
+    increment('failures', stage=stage, reason=reason)
+
+def snapshot():
+    """
+    Current span summaries and counters
+
+    Returns:
+        dict: 'spans' (name -> count, total, mean, max, errors in seconds) and
+            'counters' (list of {'name', 'labels', 'value'})
+    """
+    with _lock:
+        spans = {
+            name: dict(stats, mean=stats['total'] / stats['count'] if stats['count'] else 0.0)
+            for name, stats in _spans.items()
+        }
+        counters = [
+            {'name': name, 'labels': dict(labels), 'value': value}
+            for (name, labels), value in _counters.items()
+        ]
+    return {'spans': spans, 'counters': counters}
+
+def reset():
+    """Forget everything recorded so far"""
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+        _timeline.clear()
+
+def _prometheus_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+def to_prometheus(prefix=PROMETHEUS_PREFIX):
+    """Span summaries and counters in the Prometheus text exposition format"""
+    current = snapshot()
+    lines = [
+        f'# HELP {prefix}_span_seconds Time spent in each instrumented stage',
+        f'# TYPE {prefix}_span_seconds summary',
+    ]
+    for name, stats in sorted(current['spans'].items()):
+        labels = _prometheus_labels([('span', name)])
+        lines.append(f'{prefix}_span_seconds_count{labels} {stats["count"]}')
+        lines.append(f'{prefix}_span_seconds_sum{labels} {stats["total"]:.6f}')
+    lines.append(f'# TYPE {prefix}_span_seconds_max gauge')
+    for name, stats in sorted(current['spans'].items()):
+        lines.append(f'{prefix}_span_seconds_max{_prometheus_labels([("span", name)])} {stats["max"]:.6f}')
+
+    by_name = {}
+    for counter in current['counters']:
+        by_name.setdefault(counter['name'], []).append(counter)
+    for name, counters in sorted(by_name.items()):
+        lines.append(f'# TYPE {prefix}_{name}_total counter')
+        for counter in sorted(counters, key=lambda c: sorted(c['labels'].items())):
+            labels = _prometheus_labels(sorted(counter['labels'].items()))
+            lines.append(f'{prefix}_{name}_total{labels} {counter["value"]}')
+    return '\n'.join(lines) + '\n'
+
+def timeline():
+    """Recorded spans as Chrome trace events (microseconds since import)"""
+    with _lock:
+        spans = list(_timeline)
+        thread_names = dict(_thread_names)
+
+    pid = os.getpid()
+    events = [
+        {'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}}
+        for tid, name in thread_names.items()
+    ]
+    for name, started, duration, tid, error, attrs in spans:
+        args = {key: str(value) for key, value in attrs.items()}
+        if error is not None:
+            args['error'] = error
+        events.append({
+            'name': name, 'ph': 'X', 'pid': pid, 'tid': tid,
+            'ts': round(started * 1e6), 'dur': round(duration * 1e6), 'args': args,
+        })
+    return events
+
+def write_timeline(path):
+    """Write the timeline as a Chrome trace JSON file"""
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': timeline(), 'displayTimeUnit': 'ms'}, f)
+
+def write_metrics(path):
+    """Write Prometheus text to path, or a JSON snapshot if it ends in .json"""
+    with open(path, 'w') as f:
+        if path.endswith('.json'):
+            json.dump(snapshot(), f, indent=2)
+        else:
+            f.write(to_prometheus())
+
+@contextmanager
+def profile(path, profiler='cprofile'):
+    """
+    Profile a single run and write the result to path
+
+    Args:
+        path (str): Output file. cProfile writes pstats data (read it with
+            `python -m pstats` or snakeviz); pyinstrument writes HTML if the
+            path ends in .html, else text.
+        profiler (str): 'cprofile' profiles the calling thread and, before
+            Python 3.12, every thread started inside the block (the pipeline's
+            worker pools included); from 3.12 only one cProfile can be active
+            per process, so only the calling thread is profiled. 'pyinstrument'
+            samples the calling thread only and must be installed.
+    """
+    if profiler == 'pyinstrument':
+        from pyinstrument import Profiler
+
+        sampler = Profiler()
+        sampler.start()
+        try:
+            yield
+        finally:
+            sampler.stop()
+            with open(path, 'w') as f:
+                f.write(sampler.output_html() if path.endswith('.html') else sampler.output_text())
+        return
+
+    if profiler != 'cprofile':
+        raise ValueError(f'Unknown profiler: {profiler}')
+
+    import pstats
+
+    main_profile = cProfile.Profile()
+    thread_profiles = []
+    thread_profiles_lock = threading.Lock()
+    original_run = threading.Thread.run
+
+    def profiled_run(thread):
+        # Enabled and disabled on the thread itself; only threads that finished
+        # before the block ends are merged into the result
+        thread_profile = cProfile.Profile()
+        try:
+            thread_profile.runcall(original_run, thread)
+        finally:
+            with thread_profiles_lock:
+                thread_profiles.append(thread_profile)
+
+    per_thread = sys.version_info < (3, 12)
+    if per_thread:
+        threading.Thread.run = profiled_run
+    main_profile.enable()
+    try:
+        yield
+    finally:
+        main_profile.disable()
+        if per_thread:
+            threading.Thread.run = original_run
+        stats = pstats.Stats(main_profile)
+        with thread_profiles_lock:
+            for thread_profile in thread_profiles:
+                stats.add(thread_profile)
+        stats.dump_stats(path)
@@ -0,0 +1,307 @@
+import json
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from backend import dedup, market_data, metrics, rss_scraping, sentiment_history
+from backend.article_registry import ArticleRegistry
+from backend.gemini_analysis import iter_articles_with_gemini, generate_market_summary, local_market_summary
+from backend.sentiment import aggregate_sentiment, article_weight, score_article
+
+# Tickers analyzed at the same time by default
+DEFAULT_WORKERS = 4
+
+# Articles per ticker sent through extraction, Gemini and FinBERT
+ARTICLES_PER_TICKER = 5
+
+# Search results fetched per ticker, so that enough stories are left to fill
+# ARTICLES_PER_TICKER once syndicated copies are collapsed
+CANDIDATES_PER_TICKER = 2 * ARTICLES_PER_TICKER
+
+# Pipeline stages, in order, as recorded in each result's 'timings'
+STAGES = ["market_data", "fetch_news", "process_articles", "sentiment", "summary"]
+
+
+class _StageTimer:
+    """Context manager adding the elapsed seconds of a stage to a timings dict"""
+
+    def __init__(self, timings, stage):
+        self.timings = timings
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.timings[self.stage] = round(time.perf_counter() - self.started, 4)
+
+
+def _current_sentiment(articles, dedup_index):
+    """
+    Aggregate sentiment of the articles processed so far
+
+    Refreshes each article's 'cluster_size' and 'duplicates' first, since
+    later copies of a story can still join its cluster.
+    """
+    for article in articles:
+        article["cluster_size"] = dedup_index.cluster_size(article["url"])
+        article["duplicates"] = dedup_index.duplicates(article["url"])
+    scored = [article for article in articles if article["sentiment"] is not None]
+    if not scored:
+        return None
+    return aggregate_sentiment([article["sentiment"] for article in scored],
+                               [article_weight(article) for article in scored])
+
+
+@metrics.traced('analyze_ticker')
+def analyze_ticker(ticker, market, score_full_text=False, on_event=None, registry=None, local_only=False,
+                   fetch_news=rss_scraping.fetch_news):
+    """
+    Run the news pipeline for one ticker: fetch news, extract and condense
+    articles, score sentiment and generate the market summary.
+
+    Near-duplicate articles (the same wire story from several outlets) are
+    processed once; see backend.dedup. Each article is scored as soon as it
+    has been condensed, so per-article results can be shown before the
+    slowest download finishes. Article and aggregate scores are appended to
+    backend.sentiment_history.
+
+    Safe to run in a worker thread. Errors are recorded in the result rather
+    than raised, so one failing ticker doesn't stop the others.
+
+    Args:
+        ticker (str): Stock ticker
+        market (dict): The ticker's entry from market_data.fetch_market_data
+        score_full_text (bool): Skip Gemini condensation and let FinBERT score
+            the full extracted articles in overlapping windows
+        on_event (callable): Optional on_event(kind, ticker, payload) called as
+            the analysis progresses:
+            'articles'  - list of articles to analyze, one per story, from fetch_news
+            'article'   - {'index', 'article', 'sentiment', 'running'} for each
+                          condensed and scored article, in completion order
+            'sentiment' - the final sentiment result, before the summary is generated
+        registry (ArticleRegistry): Shared by the tickers of one run, so an article
+            several tickers reference is downloaded and condensed only once
+        local_only (bool): Condense articles with the local extractive summarizer
+            and build the market summary from their key points, without calling Gemini
+        fetch_news (callable): fetch_news(ticker, limit) returning up to limit
+            rss_scraping.fetch_news-style articles; replace it to add caching or work offline
+
+    Returns:
+        dict: Market data plus 'articles', 'condensed_articles', 'sentiment_result',
+            'market_summary', 'analysis_error' and per-stage 'timings' in seconds.
+            Each condensed article carries its own 'sentiment' result and the
+            'cluster_size' and 'duplicates' of its story.
+    """
+    def emit(kind, payload):
+        if on_event is not None:
+            on_event(kind, ticker, payload)
+
+    result = {"ticker": ticker, "analysis_error": None,
+              "articles": [], "condensed_articles": [],
+              "sentiment_result": None, "market_summary": None}
+    result.update(market)
+    result["timings"] = dict(market.get("timings", {}))
+    timings = result["timings"]
+    if result["error"] is not None:
+        return result
+
+    text_key = "text" if score_full_text else "condensed_content"
+    try:
+        with _StageTimer(timings, "fetch_news"):
+            found = fetch_news(ticker, CANDIDATES_PER_TICKER)
+
+        # Syndicated copies are collapsed by title before anything is downloaded,
+        # and by extracted text before anything is condensed. The limit applies
+        # after the first step, so a dropped copy makes room for another story.
+        candidates = dedup.cluster_articles(found)[:ARTICLES_PER_TICKER]
+        result["articles"] = candidates
+        emit("articles", candidates)
+        if not candidates:
+            return result
+
+        dedup_index = dedup.DuplicateIndex()
+
+        # Condensation and scoring overlap: FinBERT (through the queue shared by
+        # every ticker) scores each article while the rest are still downloading
+        processed = {}
+        timings["sentiment"] = 0.0
+        started = time.perf_counter()
+        stream = iter_articles_with_gemini(
+            candidates, condense=not score_full_text, dedup_index=dedup_index, registry=registry,
+            local_only=local_only,
+        )
+        for index, article in stream:
+            scoring_started = time.perf_counter()
+            article["sentiment"] = score_article(
+                article, shared_queue=True, chunked=score_full_text, text_key=text_key
+            )
+            timings["sentiment"] += time.perf_counter() - scoring_started
+
+            processed[index] = article
+            emit("article", {
+                "index": index,
+                "article": article,
+                "sentiment": article["sentiment"],
+                "running": _current_sentiment(processed.values(), dedup_index),
+            })
+        timings["process_articles"] = round(time.perf_counter() - started - timings["sentiment"], 4)
+        timings["sentiment"] = round(timings["sentiment"], 4)
+
+        condensed_articles = [processed[index] for index in sorted(processed)]
+        result["condensed_articles"] = condensed_articles
+
+        if condensed_articles:
+            result["sentiment_result"] = _current_sentiment(condensed_articles, dedup_index)
+            if result["sentiment_result"] is None:
+                raise ValueError("No valid articles could be analyzed for sentiment")
+            emit("sentiment", result["sentiment_result"])
+            try:
+                sentiment_history.record(ticker, condensed_articles, result["sentiment_result"])
+            except Exception as e:
+                # Losing a history point shouldn't lose the analysis
+                metrics.count_failure('sentiment_history', e)
+            with _StageTimer(timings, "summary"):
+                summarize = local_market_summary if local_only else generate_market_summary
+                result["market_summary"] = summarize(condensed_articles, ticker)
+    except Exception as e:
+        metrics.count_failure('analyze_ticker', e)
+        result["analysis_error"] = e
+
+    return result
+
+
+def iter_pipeline_events(tickers, start, end, max_workers=DEFAULT_WORKERS, score_full_text=False,
+                         fetch_market=market_data.fetch_market_data, local_only=False,
+                         fetch_news=rss_scraping.fetch_news):
+    """
+    Analyze many tickers concurrently, yielding progress events as they happen
+
+    Market data for all tickers is fetched first in one batch; the news
+    pipelines then run on a thread pool of max_workers, sharing one
+    ArticleRegistry. Events are yielded on the caller's thread, so they can be
+    rendered directly.
+
+    Args:
+        tickers (list): Stock tickers
+        start (date or datetime): First date of price history
+        end (date or datetime): Last date of price history, inclusive
+        max_workers (int): Tickers analyzed at the same time
+        score_full_text (bool): See analyze_ticker
+        fetch_market (callable): fetch_market(tickers, start, end) returning
+            market_data.fetch_market_data-style entries; replace it to work offline
+        local_only (bool): See analyze_ticker
+        fetch_news (callable): See analyze_ticker
+
+    Yields:
+        tuple: (kind, ticker, payload). 'market' events (the ticker's market
+            data) come first, then the analyze_ticker events, and finally one
+            'done' event per ticker whose payload is the complete result.
+    """
+    timings = {}
+    with _StageTimer(timings, "market_data"):
+        market = fetch_market(tickers, start, end)
+    for ticker in tickers:
+        market[ticker]["timings"] = timings
+        yield "market", ticker, market[ticker]
+
+    events = queue.Queue()
+    registry = ArticleRegistry()
+
+    def run(ticker):
+        try:
+            result = analyze_ticker(ticker, market[ticker], score_full_text,
+                                    on_event=lambda *event: events.put(event), registry=registry,
+                                    local_only=local_only, fetch_news=fetch_news)
+        except Exception as e:
+            # analyze_ticker records its own errors; this only guards the event stream
+            result = {"ticker": ticker, "analysis_error": e, "articles": [],
+                      "condensed_articles": [], "sentiment_result": None, "market_summary": None}
+            result.update(market[ticker])
+        events.put(("done", ticker, result))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for ticker in tickers:
+            executor.submit(run, ticker)
+
+        remaining = len(tickers)
+        while remaining:
+            event = events.get()
+            if event[0] == "done":
+                remaining -= 1
+            yield event
+
+
+def run_pipeline(tickers, start, end, max_workers=DEFAULT_WORKERS, score_full_text=False,
+                 fetch_market=market_data.fetch_market_data, local_only=False,
+                 fetch_news=rss_scraping.fetch_news):
+    """
+    Analyze many tickers concurrently, yielding each result as soon as it is ready
+
+    Args:
+        See iter_pipeline_events
+
+    Yields:
+        dict: Result of analyze_ticker for each ticker, in completion order
+    """
+    events = iter_pipeline_events(tickers, start, end, max_workers, score_full_text, fetch_market, local_only,
+                                  fetch_news)
+    for kind, _, payload in events:
+        if kind == "done":
+            yield payload
+
+
+def result_to_record(result):
+    """
+    Flatten a pipeline result into a JSON- and Parquet-friendly record
+
+    Price history is left out; articles are kept as a JSON string.
+    """
+    sentiment_result = result.get("sentiment_result") or {}
+    error = result.get("error") or result.get("analysis_error")
+
+    if result.get("error") is not None:
+        status = "market_data_failed"
+    elif result.get("analysis_error") is not None:
+        status = "analysis_failed"
+    elif not result.get("articles"):
+        status = "no_articles"
+    elif not result.get("condensed_articles"):
+        status = "no_condensed_articles"
+    else:
+        status = "ok"
+
+    record = {
+        "ticker": result["ticker"],
+        "status": status,
+        "error": str(error) if error is not None else None,
+        "last_price": _to_float(result.get("last_price")),
+        "market_cap": _to_float(result.get("market_cap")),
+        "volume": _to_float(result.get("volume")),
+        "articles_found": len(result.get("articles") or []),
+        "articles_analyzed": len(result.get("condensed_articles") or []),
+        "final_score": sentiment_result.get("final_score"),
+        "sentiment_label": sentiment_result.get("sentiment_label"),
+        "positive_count": sentiment_result.get("positive_count"),
+        "negative_count": sentiment_result.get("negative_count"),
+        "neutral_count": sentiment_result.get("neutral_count"),
+        "confidence": sentiment_result.get("confidence"),
+        "market_summary": result.get("market_summary"),
+        "articles": json.dumps([
+            {
+                "title": article.get("title"),
+                "url": article.get("url"),
+                "published_at": article.get("published_at"),
+                "condensed_content": article.get("condensed_content"),
+                "sentiment": (article.get("sentiment") or {}).get("label"),
+                "cluster_size": article.get("cluster_size", 1),
+            }
+            for article in result.get("condensed_articles") or []
+        ], default=str),
+    }
+    for stage in STAGES:
+        record[f"time_{stage}"] = result.get("timings", {}).get(stage)
+    return record
+
+
+def _to_float(value):
+    return float(value) if value is not None else None
@@ -0,0 +1,282 @@
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+from datetime import date, datetime, timedelta
+import pandas as pd
+from backend import cache, metrics
+
+# Daily OHLCV history is kept as one Parquet file per ticker, next to a small
+# JSON file listing the date ranges already downloaded
+PRICE_DIR = os.getenv('NEWS2SENTIMENT_PRICE_DIR', os.path.join(cache.CACHE_DIR, 'prices'))
+
+# Market cap and volume change during the day, so they are only cached briefly
+METRICS_TTL = 15 * 60
+
+_frames = {}
+_coverage = {}
+_coverage_mtimes = {}
+_ticker_locks = {}
+_ticker_locks_lock = threading.Lock()
+
+@metrics.traced('yfinance_history')
+def _yfinance_history(ticker, start, end):
+    """Download daily history from Yahoo Finance; `end` is exclusive"""
+    import yfinance as yf
+    return yf.Ticker(ticker).history(start=start, end=end)
+
+@metrics.traced('yfinance_metrics')
+def _yfinance_metrics(ticker):
+    """Market cap and volume from Yahoo Finance, preferring fast_info"""
+    import yfinance as yf
+    ticker_obj = yf.Ticker(ticker)
+
+    # Try fast_info first
+    fast_info = ticker_obj.fast_info
+    market_cap = getattr(fast_info, "market_cap", None)
+    volume = getattr(fast_info, "last_volume", None) or getattr(fast_info, "volume", None)
+
+    # Fallback: try .info if still missing
+    if market_cap is None or volume is None:
+        info = ticker_obj.info
+        market_cap = market_cap or info.get("marketCap", None)
+        volume = volume or info.get("volume", None)
+
+    return {"market_cap": market_cap, "volume": volume}
+
+def _ticker_lock(ticker):
+    with _ticker_locks_lock:
+        if ticker not in _ticker_locks:
+            _ticker_locks[ticker] = threading.Lock()
+        return _ticker_locks[ticker]
+
+def _paths(ticker):
+    # Tickers come from user input; keep only characters that appear in real
+    # symbols (BRK-B, ^GSPC, EURUSD=X, 7203.T) so a ticker can never name a
+    # file outside PRICE_DIR
+    name = re.sub(r'[^A-Za-z0-9.^=-]', '_', ticker).lstrip('.') or '_'
+    return os.path.join(PRICE_DIR, f"{name}.parquet"), os.path.join(PRICE_DIR, f"{name}.json")
+
+def _as_date(value):
+    return value.date() if isinstance(value, datetime) else value
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+def _load(ticker):
+    """
+    Load a ticker's stored history and coverage into memory (call with the ticker lock held)
+
+    The files are read again when another process (e.g. the watchlist worker)
+    has replaced them. A file that can't be read counts as no coverage, so the
+    dates are downloaded again rather than failing the ticker.
+    """
+    data_path, coverage_path = _paths(ticker)
+    mtime = _mtime(coverage_path)
+    if ticker in _frames and _coverage_mtimes.get(ticker) == mtime:
+        return _frames[ticker], _coverage[ticker]
+
+    frame, coverage = None, []
+    if mtime is not None:
+        try:
+            with open(coverage_path) as f:
+                coverage = [(date.fromisoformat(start), date.fromisoformat(end)) for start, end in json.load(f)]
+            if os.path.exists(data_path):
+                frame = pd.read_parquet(data_path, memory_map=True)
+        except Exception as e:
+            metrics.count_failure('price_store_load', e)
+            frame, coverage = None, []
+
+    _frames[ticker], _coverage[ticker], _coverage_mtimes[ticker] = frame, coverage, mtime
+    return frame, coverage
+
+def _replace(path, write):
+    """Write a file under a temporary name and move it into place, so readers never see it half-written"""
+    fd, temp_path = tempfile.mkstemp(dir=PRICE_DIR, prefix='.tmp-')
+    os.close(fd)
+    try:
+        write(temp_path)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def _save(ticker, frame, coverage):
+    os.makedirs(PRICE_DIR, exist_ok=True)
+    data_path, coverage_path = _paths(ticker)
+
+    def write_coverage(path):
+        with open(path, 'w') as f:
+            json.dump([[start.isoformat(), end.isoformat()] for start, end in coverage], f)
+
+    # A range can be covered without any bars (weekends, holidays). The data
+    # goes first, so coverage never lists dates the data file doesn't have yet.
+    if frame is not None:
+        _replace(data_path, frame.to_parquet)
+    _replace(coverage_path, write_coverage)
+    _frames[ticker], _coverage[ticker] = frame, coverage
+    _coverage_mtimes[ticker] = _mtime(coverage_path)
+
+def missing_ranges(coverage, start, end):
+    """
+    Date ranges within [start, end] that the coverage list does not include
+
+    Args:
+        coverage (list): Sorted, non-overlapping (start, end) date pairs, inclusive
+        start (date): First date wanted
+        end (date): Last date wanted
+
+    Returns:
+        list: (start, end) date pairs still to download, inclusive
+    """
+    gaps = []
+    cursor = start
+    for covered_start, covered_end in coverage:
+        if covered_end < cursor:
+            continue
+        if covered_start > end:
+            break
+        if covered_start > cursor:
+            gaps.append((cursor, covered_start - timedelta(days=1)))
+        cursor = max(cursor, covered_end + timedelta(days=1))
+    if cursor <= end:
+        gaps.append((cursor, end))
+    return gaps
+
+def _merge_ranges(ranges):
+    """Merge overlapping or adjacent (start, end) date pairs"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def _normalize(frame):
+    """Index daily bars by naive dates so stored and new data line up"""
+    if frame.index.tz is not None:
+        frame = frame.tz_localize(None)
+    frame.index = frame.index.normalize()
+    frame.index.name = "Date"
+    return frame
+
+def store_history(ticker, frame, start, end):
+    """
+    Merge downloaded bars into the store and mark [start, end] as covered
+
+    Today's bar is still changing, so today is never marked as covered and
+    will be downloaded again next time. A download without any bars is only
+    recorded when the range has no weekdays: yfinance reports a failed ticker
+    as an empty result rather than an error, and the range is retried instead.
+
+    Args:
+        ticker (str): Stock ticker
+        frame (DataFrame): Daily bars as returned by yfinance
+        start (date): First date the download covered
+        end (date): Last date the download covered, inclusive
+    """
+    with _ticker_lock(ticker):
+        stored, coverage = _load(ticker)
+        has_bars = not frame.empty
+        if has_bars:
+            frame = _normalize(frame)
+            if stored is not None:
+                frame = pd.concat([stored, frame])
+                frame = frame[~frame.index.duplicated(keep='last')]
+            stored = frame.sort_index()
+
+        end = min(end, date.today() - timedelta(days=1))
+        if start <= end and (has_bars or pd.bdate_range(start, end).empty):
+            coverage = _merge_ranges(coverage + [(start, end)])
+        _save(ticker, stored, coverage)
+
+def get_missing_ranges(ticker, start, end):
+    """Date ranges of [start, end] not yet in the store for a ticker"""
+    with _ticker_lock(ticker):
+        _, coverage = _load(ticker)
+    return missing_ranges(coverage, _as_date(start), _as_date(end))
+
+def read_history(ticker, start, end):
+    """
+    Slice stored daily bars for [start, end] without downloading
+
+    The slice is positional on the sorted index, so pandas shares the stored
+    data rather than copying it.
+
+    Returns:
+        DataFrame: Bars indexed by date; empty if nothing is stored
+    """
+    with _ticker_lock(ticker):
+        stored, _ = _load(ticker)
+    if stored is None:
+        return pd.DataFrame()
+
+    first = stored.index.searchsorted(pd.Timestamp(_as_date(start)), side='left')
+    last = stored.index.searchsorted(pd.Timestamp(_as_date(end)), side='right')
+    return stored.iloc[first:last]
+
+def get_history(ticker, start, end, fetch_history=_yfinance_history):
+    """
+    Daily history for [start, end], downloading only the dates not yet stored
+
+    Args:
+        ticker (str): Stock ticker
+        start (date or datetime): First date wanted
+        end (date or datetime): Last date wanted, inclusive
+        fetch_history (callable): fetch_history(ticker, start, end_exclusive)
+            returning a yfinance-style DataFrame; replace it to work offline
+
+    Returns:
+        DataFrame: Bars indexed by date
+    """
+    for gap_start, gap_end in get_missing_ranges(ticker, start, end):
+        frame = fetch_history(ticker, gap_start, gap_end + timedelta(days=1))
+        store_history(ticker, frame, gap_start, gap_end)
+    return read_history(ticker, start, end)
+
+def get_metrics(ticker, fetch_metrics=_yfinance_metrics):
+    """
+    Market cap and volume for a ticker, cached for METRICS_TTL seconds
+
+    Args:
+        ticker (str): Stock ticker
+        fetch_metrics (callable): fetch_metrics(ticker) returning a dict with
+            'market_cap' and 'volume'; replace it to work offline
+
+    Returns:
+        dict: 'market_cap' and 'volume' (either may be None)
+    """
+    ticker_metrics = cache.get('metrics', ticker, ttl=METRICS_TTL)
+    if ticker_metrics is None:
+        ticker_metrics = fetch_metrics(ticker)
+        cache.put('metrics', ticker, ticker_metrics)
+    return ticker_metrics
+
+def clear(history=True):
+    """
+    Forget cached market cap and volume, and optionally all stored history
+
+    Args:
+        history (bool): Also delete the stored daily bars and their coverage
+    """
+    cache.clear('metrics')
+    if history:
+        with _ticker_locks_lock:
+            locks = list(_ticker_locks.values())
+        for lock in locks:
+            lock.acquire()
+        try:
+            _frames.clear()
+            _coverage.clear()
+            _coverage_mtimes.clear()
+            shutil.rmtree(PRICE_DIR, ignore_errors=True)
+        finally:
+            for lock in locks:
+                lock.release()
@@ -1,116 +1,142 @@
 import feedparser
 import requests
-from bs4 import BeautifulSoup
+import soupsieve
+from bs4 import BeautifulSoup, SoupStrainer
+from backend import http_client, metrics
+
+# lxml is much faster than the pure-Python parser; use it when installed
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+# Where searches go; {query} is the URL-encoded search. Pointed elsewhere by the
+# offline benchmark (benchmarks/end_to_end.py)
+GOOGLE_SEARCH_URL = "https://www.google.com/search?q={query}&gl=us&tbm=nws&num=100"
+GOOGLE_NEWS_RSS_URL = "https://news.google.com/rss/search?q={query}&hl=en-US&gl=US&ceid=US:en"
+
+# Result containers, tried in order in case Google changes their HTML structure
+RESULT_SELECTORS = [
+    "div.SoaBEf",  # Original selector
+    "div[data-ved]",  # Alternative selector
+    "div.g",  # Generic Google result selector
+]
+
+# Fields inside a result container, each tried in order
+TITLE_SELECTORS = ["div.MBeuO", "h3", "div[role='heading']", "a h3"]
+SNIPPET_SELECTORS = [".GI74Re", ".s3v9rd", "span"]
+DATE_SELECTORS = [".LfVVr", ".LEwnzc", ".f"]
+SOURCE_SELECTORS = [".NUnG9d span", ".CEMjEf", ".WfABme"]
+
+# Selectors are compiled once here rather than on every select_one call
+_RESULT_PATTERNS = [soupsieve.compile(selector) for selector in RESULT_SELECTORS]
+_TITLE_PATTERNS = [soupsieve.compile(selector) for selector in TITLE_SELECTORS]
+_SNIPPET_PATTERNS = [soupsieve.compile(selector) for selector in SNIPPET_SELECTORS]
+_DATE_PATTERNS = [soupsieve.compile(selector) for selector in DATE_SELECTORS]
+_SOURCE_PATTERNS = [soupsieve.compile(selector) for selector in SOURCE_SELECTORS]
+
+# Only build the result containers for the usual layout, skipping scripts,
+# styles and page chrome; other layouts fall back to a full parse
+_RESULT_STRAINER = SoupStrainer("div", attrs={"class": "SoaBEf"})
 
 
 def clean_title(title):
     return title.rsplit(' - ', 1)[0].strip()
 
-def scrape_google_news_search(search_terms):
+def _first_text(element, patterns):
+    """Text of the first pattern that matches inside element, or None"""
+    for pattern in patterns:
+        found = pattern.select_one(element)
+        if found:
+            return found.get_text(strip=True)
+    return None
+
+def _extract_results(soup, patterns, limit):
+    """Build result dicts from the first container pattern that yields any"""
+    news_results = []
+    
+    for pattern in patterns:
+        for el in pattern.select(soup, limit=limit):
+            try:
+                # Extract link
+                link_element = el.find("a")
+                if not link_element or not link_element.get("href"):
+                    continue
+                
+                # Extract title
+                title = _first_text(el, _TITLE_PATTERNS)
+                if not title:
+                    continue
+                
+                news_results.append({
+                    "title": clean_title(title),
+                    "url": link_element["href"],
+                    "snippet": _first_text(el, _SNIPPET_PATTERNS) or "",
+                    "published_at": _first_text(el, _DATE_PATTERNS) or "",
+                    "source": _first_text(el, _SOURCE_PATTERNS) or ""
+                })
+                
+            except Exception as e:
+                continue
+        
+        if news_results:
+            break  # If we found results with this selector, stop trying others
+    
+    return news_results
+
+def parse_search_results(html, limit=5, parser=HTML_PARSER, strained=True):
+    """
+    Parse a Google News search results page into article dicts
+    
+    Looks at no more than `limit` result containers. With strained=True only the
+    usual result containers are parsed; the other layouts are tried on a
+    full parse only when that finds nothing.
+    """
+    if strained:
+        soup = BeautifulSoup(html, parser, parse_only=_RESULT_STRAINER)
+        news_results = _extract_results(soup, _RESULT_PATTERNS[:1], limit)
+        if news_results:
+            return news_results
+        soup = BeautifulSoup(html, parser)
+        return _extract_results(soup, _RESULT_PATTERNS[1:], limit)
+    
+    soup = BeautifulSoup(html, parser)
+    return _extract_results(soup, _RESULT_PATTERNS, limit)
+
+@metrics.traced('scrape_google_news_search')
+def scrape_google_news_search(search_terms, limit=5):
     """Scrape Google News search results to get actual article URLs"""
     try:
         # Construct Google News search URL
         search_query = f"{search_terms} stock"
         encoded_query = requests.utils.quote(search_query)
-        url = f"https://www.google.com/search?q={encoded_query}&gl=us&tbm=nws&num=100"
-        
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/101.0.4951.54 Safari/537.36"
-        }
-        
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
+        url = GOOGLE_SEARCH_URL.format(query=encoded_query)
         
-        soup = BeautifulSoup(response.content, "html.parser")
-        news_results = []
+        # Shared session sends a browser User-Agent and applies timeouts
+        response = http_client.get(url)
         
-        # Try multiple selectors in case Google changes their HTML structure
-        selectors_to_try = [
-            "div.SoaBEf",  # Original selector
-            "div[data-ved]",  # Alternative selector
-            "div.g",  # Generic Google result selector
-        ]
-        
-        for selector in selectors_to_try:
-            elements = soup.select(selector)
-            
-            if elements:
-                for el in elements[:5]:  # Limit to 5 articles
-                    try:
-                        # Extract link
-                        link_element = el.find("a")
-                        if not link_element or not link_element.get("href"):
-                            continue
-                            
-                        link = link_element["href"]
-                        
-                        # Extract title
-                        title_selectors = ["div.MBeuO", "h3", "div[role='heading']", "a h3"]
-                        title = None
-                        for title_sel in title_selectors:
-                            title_elem = el.select_one(title_sel)
-                            if title_elem:
-                                title = title_elem.get_text(strip=True)
-                                break
-                        
-                        if not title:
-                            continue
-                        
-                        # Extract snippet
-                        snippet_selectors = [".GI74Re", ".s3v9rd", "span"]
-                        snippet = ""
-                        for snippet_sel in snippet_selectors:
-                            snippet_elem = el.select_one(snippet_sel)
-                            if snippet_elem:
-                                snippet = snippet_elem.get_text(strip=True)
-                                break
-                        
-                        # Extract date
-                        date_selectors = [".LfVVr", ".LEwnzc", ".f"]
-                        date = ""
-                        for date_sel in date_selectors:
-                            date_elem = el.select_one(date_sel)
-                            if date_elem:
-                                date = date_elem.get_text(strip=True)
-                                break
-                        
-                        # Extract source
-                        source_selectors = [".NUnG9d span", ".CEMjEf", ".WfABme"]
-                        source = ""
-                        for source_sel in source_selectors:
-                            source_elem = el.select_one(source_sel)
-                            if source_elem:
-                                source = source_elem.get_text(strip=True)
-                                break
-                        
-                        news_results.append({
-                            "title": clean_title(title),
-                            "url": link,
-                            "snippet": snippet,
-                            "published_at": date,
-                            "source": source
-                        })
-                        
-                    except Exception as e:
-                        continue
-                
-                if news_results:
-                    break  # If we found results with this selector, stop trying others
-        
-        return news_results
+        return parse_search_results(response.content, limit=limit)
         
     except Exception as e:
+        metrics.count_failure('scrape_google_news_search', e)
         return []
 
-def fetch_news_rss_fallback(search_terms):
+@metrics.traced('fetch_news_rss_fallback')
+def fetch_news_rss_fallback(search_terms, limit=5):
     """Fallback to RSS feed if search scraping doesn't work"""
     articles = []
     search_terms = search_terms.replace(" ", "+")
 
-    gn_url = f"https://news.google.com/rss/search?q={search_terms}&hl=en-US&gl=US&ceid=US:en"
-    gn_feed = feedparser.parse(gn_url)
+    gn_url = GOOGLE_NEWS_RSS_URL.format(query=search_terms)
+    try:
+        # Fetch through the shared session so an unchanged feed is a cheap 304
+        gn_feed = feedparser.parse(http_client.get(gn_url).content)
+    except requests.RequestException as e:
+        metrics.count_failure('fetch_news_rss_fallback', e)
+        return []
     if gn_feed.entries:
-        for news_item in gn_feed.entries[:5]:
+        for news_item in gn_feed.entries[:limit]:
             news_title = clean_title(news_item.title)
             news_link = news_item.link
             publication_date = news_item.published
@@ -119,15 +145,18 @@ def fetch_news_rss_fallback(search_terms):
     else:
         return []
 
-def fetch_news(search_terms):
+@metrics.traced('fetch_news')
+def fetch_news(search_terms, limit=5):
     """
     Fetch news using Google News search scraping (with RSS fallback)
+    
+    Returns at most `limit` articles.
     """
     # Try Google News search scraping first
-    articles = scrape_google_news_search(search_terms)
+    articles = scrape_google_news_search(search_terms, limit)
     
     # If search scraping doesn't work well, fall back to RSS
     if not articles:
-        articles = fetch_news_rss_fallback(search_terms)
+        articles = fetch_news_rss_fallback(search_terms, limit)
     
     return articles
\ No newline at end of file
@@ -1,27 +1,136 @@
-from transformers import pipeline
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from backend import cache, dedup, metrics
 
-# Initialize the FinBERT model for financial sentiment analysis
-pipe = pipeline("text-classification", model="ProsusAI/finbert")
+# FinBERT model for financial sentiment analysis: a hub id, or a local path to
+# run offline from a downloaded (or smaller) checkpoint
+MODEL_ID = os.getenv('FINBERT_MODEL_ID', "ProsusAI/finbert")
 
-def analyze_single_article(article_text):
+# Inference engine: 'torch' (transformers pipeline, default) or 'onnx'
+# (exported model with int8 dynamic quantization, run through onnxruntime)
+SENTIMENT_ENGINE = os.getenv('SENTIMENT_ENGINE', 'torch')
+
+# The pipeline and engines are loaded on first use so importing this module stays cheap
+_pipe = None
+_pipe_lock = threading.Lock()
+_engines = {}
+_engines_lock = threading.Lock()
+
+# Number of articles sent through FinBERT in one forward pass
+DEFAULT_BATCH_SIZE = 16
+
+# Long documents can be scored in overlapping token windows instead of being
+# truncated to FinBERT's 512-token limit
+CHUNK_WINDOW = 512   # Tokens per window, including [CLS] and [SEP]
+CHUNK_STRIDE = 128   # Tokens shared between neighbouring windows
+
+# Sentiment results are deterministic for a given model and text, so they are
+# memoized in memory and optionally in the on-disk cache as well
+RESULT_CACHE_SIZE = 4096
+RESULT_CACHE_PERSIST = os.getenv('SENTIMENT_CACHE_PERSIST', '0') == '1'
+_result_cache = OrderedDict()
+_result_cache_lock = threading.Lock()
+
+# Shared inference queue: requests from concurrent callers (e.g. one thread per
+# ticker) are merged into a single batched FinBERT run
+BATCH_QUEUE_WAIT = 0.05  # Longest a batch waits for other callers, from its first request
+BATCH_QUEUE_SIZE = DEFAULT_BATCH_SIZE  # Texts at which a batch runs without waiting further
+BATCH_RESULT_TIMEOUT = 120  # Longest a caller waits on the queue before scoring its texts itself
+_batch_queue = queue.Queue()
+_batch_worker = None
+_batch_worker_lock = threading.Lock()
+
+def get_pipeline():
     """
-    Analyze sentiment of a single condensed article using FinBERT
+    Get the shared FinBERT pipeline, loading it on first use
+    
+    The pipeline is created once per process; concurrent callers wait
+    for the first load instead of loading the model again.
+    
+    Returns:
+        Pipeline: Hugging Face text-classification pipeline for FinBERT
+    """
+    global _pipe
+    if _pipe is None:
+        with _pipe_lock:
+            if _pipe is None:
+                # Import here so the color/emoji helpers don't pay for transformers
+                from transformers import pipeline
+                _pipe = pipeline("text-classification", model=MODEL_ID)
+    return _pipe
+
+class _TorchEngine:
+    """FinBERT running in PyTorch through the transformers pipeline's model"""
+    
+    name = 'torch'
+    
+    def __init__(self, pipe):
+        self.tokenizer = pipe.tokenizer
+        self.model = pipe.model
+        self.id2label = pipe.model.config.id2label
+    
+    def logits(self, batch):
+        """Class logits for a padded batch of numpy inputs"""
+        import torch
+        
+        inputs = {name: torch.as_tensor(array).to(self.model.device) for name, array in batch.items()}
+        with torch.no_grad():
+            return self.model(**inputs).logits.float().cpu().numpy()
+
+def get_engine(name=None):
+    """
+    Get the shared inference engine, loading it on first use
+    
+    Every engine exposes `tokenizer`, `id2label` and `logits(batch)`, so
+    analyze_articles and the batch helpers work the same with any of them.
     
     Args:
-        article_text (str): Condensed article text from Gemini
+        name (str): 'torch' or 'onnx'; defaults to SENTIMENT_ENGINE
         
     Returns:
-        dict: Sentiment analysis result with label, confidence, and score
+        Engine: The loaded inference engine
     """
-    if not article_text or len(article_text.strip()) < 10:
-        raise ValueError("Article text is too short or empty")
-    
-    result = pipe(article_text)
+    name = name or SENTIMENT_ENGINE
+    if name not in _engines:
+        with _engines_lock:
+            if name not in _engines:
+                if name == 'torch':
+                    _engines[name] = _TorchEngine(get_pipeline())
+                elif name == 'onnx':
+                    from backend import finbert_onnx
+                    _engines[name] = finbert_onnx.OnnxEngine(MODEL_ID)
+                else:
+                    raise ValueError(f"Unknown sentiment engine: {name}")
+    return _engines[name]
+
+def warm_up(engine=None):
+    """
+    Load FinBERT and run one dummy prediction so the first real call is fast
     
-    # FinBERT returns a list with one result
-    if isinstance(result, list) and len(result) > 0:
-        result = result[0]
+    Args:
+        engine (str): Engine to warm up; defaults to SENTIMENT_ENGINE
+        
+    Returns:
+        Engine: The loaded inference engine
+    """
+    engine = get_engine(engine)
+    _score_windows([engine.tokenizer("Markets were steady today.")['input_ids']], 1, engine)
+    return engine
+
+def _to_sentiment_result(result):
+    """
+    Convert a raw FinBERT prediction into our sentiment result format
     
+    Args:
+        result (dict): Prediction with 'label' and 'score'
+        
+    Returns:
+        dict: Sentiment analysis result with label, confidence, and score
+    """
     # Extract label and confidence - NO FALLBACKS
     label = result['label']
     confidence = result['score']
@@ -41,12 +150,346 @@ def analyze_single_article(article_text):
         "raw_score": raw_score
     }
 
-def calculate_final_sentiment_score(condensed_articles):
+def _logits_to_result(logits, id2label):
+    """Softmax one row of class logits and convert the top class to a sentiment result"""
+    import numpy as np
+    
+    probabilities = np.exp(logits - logits.max())
+    probabilities /= probabilities.sum()
+    label_id = int(probabilities.argmax())
+    return _to_sentiment_result({
+        'label': id2label[label_id],
+        'score': float(probabilities[label_id]),
+    })
+
+def _result_key(article_text, chunked=False, engine_name=None):
+    """Cache key for an article: model, engine, scoring mode and a hash of the whitespace-normalized text"""
+    normalized = " ".join(article_text.split())
+    mode = f"chunked:{CHUNK_WINDOW}:{CHUNK_STRIDE}" if chunked else "truncated"
+    return cache.text_hash(MODEL_ID, engine_name or SENTIMENT_ENGINE, mode, normalized)
+
+def _get_cached_result(key):
+    """Look up a sentiment result in memory, then in the persistent store"""
+    with _result_cache_lock:
+        if key in _result_cache:
+            _result_cache.move_to_end(key)
+            return _result_cache[key]
+    
+    if RESULT_CACHE_PERSIST:
+        result = cache.get('sentiment', key)
+        if result is not None:
+            _remember_result(key, result, persist=False)
+        return result
+    return None
+
+def _remember_result(key, result, persist=True):
+    """Store a sentiment result in the in-memory LRU (and persistent store if enabled)"""
+    with _result_cache_lock:
+        _result_cache[key] = result
+        _result_cache.move_to_end(key)
+        while len(_result_cache) > RESULT_CACHE_SIZE:
+            _result_cache.popitem(last=False)
+    
+    if persist and RESULT_CACHE_PERSIST:
+        cache.put('sentiment', key, result)
+
+def clear_result_cache():
+    """Forget memoized sentiment results (in memory and on disk)"""
+    with _result_cache_lock:
+        _result_cache.clear()
+    cache.clear('sentiment')
+
+@metrics.traced('analyze_single_article')
+def analyze_single_article(article_text):
+    """
+    Analyze sentiment of a single condensed article using FinBERT
+    
+    Args:
+        article_text (str): Condensed article text from Gemini
+        
+    Returns:
+        dict: Sentiment analysis result with label, confidence, and score
+    """
+    return analyze_articles([article_text])[0]
+
+def _score_windows(window_ids, batch_size, engine):
+    """
+    Run the engine over tokenized windows in batches grouped by length
+    
+    Args:
+        window_ids (list): Token id lists, each at most CHUNK_WINDOW long
+        batch_size (int): Maximum number of windows per forward pass
+        engine: Inference engine from get_engine
+        
+    Returns:
+        list: numpy logits row for each window, in input order
+    """
+    # Sort by token length so windows in the same batch need little padding
+    order = sorted(range(len(window_ids)), key=lambda i: len(window_ids[i]))
+    window_logits = [None] * len(window_ids)
+    for start in range(0, len(order), batch_size):
+        batch_indices = order[start:start + batch_size]
+        batch = engine.tokenizer.pad(
+            {'input_ids': [window_ids[i] for i in batch_indices]}, return_tensors='np'
+        )
+        for i, row in zip(batch_indices, engine.logits(dict(batch))):
+            window_logits[i] = row
+    return window_logits
+
+def _run_model(texts, batch_size, engine):
+    """
+    Run FinBERT over texts truncated to one window each
+    
+    Args:
+        texts (list): Texts to classify
+        batch_size (int): Maximum number of texts per forward pass
+        engine: Inference engine from get_engine
+        
+    Returns:
+        list: Sentiment analysis results in input order
+    """
+    encoded = engine.tokenizer(list(texts), truncation=True, max_length=CHUNK_WINDOW)
+    logits = _score_windows(encoded['input_ids'], batch_size, engine)
+    return [_logits_to_result(row, engine.id2label) for row in logits]
+
+def _run_chunked_model(texts, batch_size, engine):
+    """
+    Run FinBERT over overlapping token windows of each text and combine them
+    
+    Windows from every text are scored together, grouped by length, and each
+    text's window logits are averaged weighted by window length.
+    
+    Args:
+        texts (list): Texts to classify, of any length
+        batch_size (int): Maximum number of windows per forward pass
+        engine: Inference engine from get_engine
+        
+    Returns:
+        list: Sentiment analysis results in input order
+    """
+    encoded = engine.tokenizer(
+        list(texts),
+        truncation=True,
+        max_length=CHUNK_WINDOW,
+        stride=CHUNK_STRIDE,
+        return_overflowing_tokens=True,
+    )
+    window_ids = encoded['input_ids']
+    window_logits = _score_windows(window_ids, batch_size, engine)
+    
+    # Combine each text's windows, weighting by the number of tokens they cover
+    totals = [None] * len(texts)
+    weights = [0] * len(texts)
+    for i, owner in enumerate(encoded['overflow_to_sample_mapping']):
+        weighted = window_logits[i] * len(window_ids[i])
+        totals[owner] = weighted if totals[owner] is None else totals[owner] + weighted
+        weights[owner] += len(window_ids[i])
+    
+    return [_logits_to_result(total / weight, engine.id2label) for total, weight in zip(totals, weights)]
+
+@metrics.traced('analyze_articles')
+def analyze_articles(texts, batch_size=DEFAULT_BATCH_SIZE, chunked=False, engine=None):
+    """
+    Analyze sentiment of many condensed articles using batched FinBERT inference
+    
+    Results are memoized by model and text, so only texts not seen before
+    are sent to the model. Those are grouped by token length before batching
+    so each forward pass pads to a similar length.
+    
+    Args:
+        texts (list): Condensed article texts
+        batch_size (int): Maximum number of texts (or windows) per forward pass
+        chunked (bool): Score long texts in overlapping windows instead of
+            truncating them at 512 tokens
+        engine (str): Inference engine name; defaults to SENTIMENT_ENGINE
+        
+    Returns:
+        list: Sentiment analysis results, one per input text, in input order
+    """
+    for article_text in texts:
+        if not article_text or len(article_text.strip()) < 10:
+            raise ValueError("Article text is too short or empty")
+    
+    results = [None] * len(texts)
+    
+    # Serve repeated texts from the cache and collect unique misses
+    miss_positions = OrderedDict()
+    for i, article_text in enumerate(texts):
+        key = _result_key(article_text, chunked, engine)
+        cached = _get_cached_result(key)
+        if cached is not None:
+            results[i] = dict(cached)
+            metrics.increment('cache_requests', namespace='sentiment_memo', result='hit')
+        else:
+            miss_positions.setdefault(key, []).append(i)
+            metrics.increment('cache_requests', namespace='sentiment_memo', result='miss')
+    
+    if miss_positions:
+        miss_texts = [texts[positions[0]] for positions in miss_positions.values()]
+        run_model = _run_chunked_model if chunked else _run_model
+        model_engine = get_engine(engine)
+        with metrics.span('finbert_inference', engine=model_engine.name, texts=len(miss_texts), chunked=chunked):
+            miss_results = run_model(miss_texts, batch_size, model_engine)
+        for (key, positions), result in zip(miss_positions.items(), miss_results):
+            _remember_result(key, result)
+            for i in positions:
+                results[i] = dict(result)
+    
+    return results
+
+def _next_batch():
+    """Queued requests for one batch, skipping those whose caller gave up waiting"""
+    requests = []
+    queued_texts = 0
+    deadline = None
+    while queued_texts < BATCH_QUEUE_SIZE:
+        if deadline is None:
+            request = _batch_queue.get()
+        else:
+            # Give callers running alongside a moment to join this batch, but no
+            # longer than BATCH_QUEUE_WAIT after the first of them arrived
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = _batch_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+        if not request[2].set_running_or_notify_cancel():
+            continue
+        if deadline is None:
+            deadline = time.monotonic() + BATCH_QUEUE_WAIT
+        requests.append(request)
+        queued_texts += len(request[0])
+    return requests
+
+def _batch_worker_loop():
+    """Merge queued requests into one analyze_articles call per mode and hand back each slice"""
+    while True:
+        requests = _next_batch()
+        try:
+            _run_batch(requests)
+        except Exception as e:
+            # Never leave a caller waiting, and keep serving the queue
+            metrics.count_failure('finbert_batch', e)
+            for _, _, future in requests:
+                if not future.done():
+                    future.set_exception(e)
+
+def _run_batch(requests):
+    """Score a batch of queued requests and resolve each request's future"""
+    for chunked in (False, True):
+        mode_requests = [request for request in requests if request[1] == chunked]
+        if not mode_requests:
+            continue
+        
+        texts = [text for request_texts, _, _ in mode_requests for text in request_texts]
+        try:
+            results = analyze_articles(texts, chunked=chunked)
+        except Exception as e:
+            for _, _, future in mode_requests:
+                future.set_exception(e)
+            continue
+        
+        start = 0
+        for request_texts, _, future in mode_requests:
+            future.set_result(results[start:start + len(request_texts)])
+            start += len(request_texts)
+
+@metrics.traced('analyze_articles_queued')
+def analyze_articles_queued(texts, chunked=False):
+    """
+    Analyze articles through the shared inference queue
+    
+    Behaves like analyze_articles, but texts submitted at about the same time
+    from different threads are scored together in one batched run. Texts
+    already in the result memo are answered without going through the queue.
+    
+    Args:
+        texts (list): Condensed article texts
+        chunked (bool): Score long texts in overlapping windows
+        
+    Returns:
+        list: Sentiment analysis results, one per input text, in input order
+    """
+    global _batch_worker
+    for article_text in texts:
+        if not article_text or len(article_text.strip()) < 10:
+            raise ValueError("Article text is too short or empty")
+    
+    if not texts:
+        return []
+    
+    results = [None] * len(texts)
+    misses = []
+    for i, article_text in enumerate(texts):
+        cached = _get_cached_result(_result_key(article_text, chunked))
+        if cached is not None:
+            results[i] = dict(cached)
+            metrics.increment('cache_requests', namespace='sentiment_memo', result='hit')
+        else:
+            misses.append(i)
+    if not misses:
+        return results
+    
+    with _batch_worker_lock:
+        # Start the worker on first use, and again if it has died
+        if _batch_worker is None or not _batch_worker.is_alive():
+            _batch_worker = threading.Thread(target=_batch_worker_loop, name="finbert-batcher", daemon=True)
+            _batch_worker.start()
+    
+    miss_texts = [texts[i] for i in misses]
+    future = Future()
+    _batch_queue.put((miss_texts, chunked, future))
+    try:
+        miss_results = future.result(timeout=BATCH_RESULT_TIMEOUT)
+    except FutureTimeoutError as e:
+        # The queue is stuck or far behind; score these texts here instead
+        future.cancel()
+        metrics.count_failure('analyze_articles_queued', e)
+        miss_results = analyze_articles(miss_texts, chunked=chunked)
+    for i, result in zip(misses, miss_results):
+        results[i] = result
+    return results
+
+def _article_text(article, text_key):
+    """Text to score for a condensed article dict or a plain string"""
+    if isinstance(article, dict):
+        return article.get(text_key) or None
+    if isinstance(article, str):
+        return article
+    return None
+
+def score_article(article, shared_queue=False, chunked=False, text_key='condensed_content'):
+    """
+    Score one condensed article as soon as it is available
+    
+    Lets callers stream per-article sentiment while other articles are still
+    being downloaded or condensed; with shared_queue=True the text is still
+    batched with whatever else is waiting for FinBERT.
+    
+    Returns:
+        dict: Sentiment result, or None if the article has no text worth scoring
+    """
+    text = _article_text(article, text_key)
+    if not text or len(text.strip()) < 10:
+        return None
+    if shared_queue:
+        return analyze_articles_queued([text], chunked=chunked)[0]
+    return analyze_articles([text], chunked=chunked)[0]
+
+def calculate_final_sentiment_score(condensed_articles, shared_queue=False, chunked=False,
+                                    text_key='condensed_content'):
     """
     Calculate final sentiment score (0-100) from multiple condensed articles
     
     Args:
         condensed_articles (list): List of condensed articles from Gemini analysis
+        shared_queue (bool): Score through the shared inference queue so concurrent
+            callers are batched together
+        chunked (bool): Score long texts in overlapping windows instead of truncating
+        text_key (str): Article field to score, e.g. 'text' for the full extracted
+            article instead of the Gemini condensation
         
     Returns:
         dict: Final sentiment analysis with score (0-100) and breakdown
@@ -54,19 +497,41 @@ def calculate_final_sentiment_score(condensed_articles):
     if not condensed_articles:
         raise ValueError("No condensed articles provided for sentiment analysis")
     
-    # Analyze each condensed article
-    sentiment_results = []
-    for article in condensed_articles:
-        if isinstance(article, dict) and 'condensed_content' in article:
-            article_text = article['condensed_content']
-        elif isinstance(article, str):
-            article_text = article
-        else:
-            continue
-            
-        result = analyze_single_article(article_text)
-        sentiment_results.append(result)
+    # Collect the text of each condensed article
+    scored_articles = [article for article in condensed_articles if _article_text(article, text_key)]
+    article_texts = [_article_text(article, text_key) for article in scored_articles]
+    
+    # Analyze all articles together in batches
+    if shared_queue:
+        sentiment_results = analyze_articles_queued(article_texts, chunked=chunked)
+    else:
+        sentiment_results = analyze_articles(article_texts, chunked=chunked)
+    
+    # Stories carried by several outlets (see backend.dedup) count for more
+    weights = [article_weight(article) for article in scored_articles]
+    return aggregate_sentiment(sentiment_results, weights)
+
+def article_weight(article):
+    """Aggregate weight of a condensed article from the size of its duplicate cluster"""
+    if isinstance(article, dict):
+        return dedup.cluster_weight(article.get('cluster_size', 1))
+    return 1.0
+
+def aggregate_sentiment(sentiment_results, weights=None):
+    """
+    Combine per-article FinBERT results into the final 0-100 sentiment score
     
+    Used both for the full set of articles and for the running score while
+    articles are still arriving.
+    
+    Args:
+        sentiment_results (list): Results from analyze_articles / analyze_single_article
+        weights (list): Optional per-article weights applied on top of confidence,
+            e.g. dedup.cluster_weight for stories carried by several outlets
+        
+    Returns:
+        dict: Final sentiment analysis with score (0-100) and breakdown
+    """
     if not sentiment_results:
         raise ValueError("No valid articles could be analyzed for sentiment")
     
@@ -76,7 +541,10 @@ def calculate_final_sentiment_score(condensed_articles):
     labels = [result['label'] for result in sentiment_results]
     
     # Weight by confidence
-    weighted_score = sum(score * conf for score, conf in zip(raw_scores, confidences)) / sum(confidences)
+    if weights is None:
+        weights = [1.0] * len(sentiment_results)
+    article_weights = [conf * weight for conf, weight in zip(confidences, weights)]
+    weighted_score = sum(score * weight for score, weight in zip(raw_scores, article_weights)) / sum(article_weights)
     
     # Convert from (-1, 1) to (0, 100) scale
     # -1 maps to 0, 0 maps to 50, 1 maps to 100
@@ -0,0 +1,229 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import pandas as pd
+from backend import cache, dedup, metrics
+
+# Every analysis is appended here, so sentiment can be charted over time
+# without re-running the pipeline
+HISTORY_PATH = os.getenv('SENTIMENT_HISTORY_PATH', os.path.join(cache.CACHE_DIR, 'sentiment_history.sqlite3'))
+
+# Set SENTIMENT_HISTORY=0 to stop recording
+HISTORY_ENABLED = os.getenv('SENTIMENT_HISTORY', '1') != '0'
+
+ARTICLE_COLUMNS = ["ticker", "timestamp", "recorded_at", "url", "title", "label",
+                   "raw_score", "confidence", "cluster_size"]
+AGGREGATE_COLUMNS = ["ticker", "recorded_at", "final_score", "sentiment_label", "confidence",
+                     "total_articles", "positive_count", "negative_count", "neutral_count"]
+
+# Search results give ages like "3 hours ago" rather than dates
+_RELATIVE_TIME = re.compile(r'^\s*(\d+|an?|one)\s+(mins?|minutes?|hours?|hrs?|days?|weeks?|months?|years?)\s+ago\s*$',
+                            re.IGNORECASE)
+_UNIT_SECONDS = {'min': 60, 'hour': 3600, 'hr': 3600, 'day': 86400, 'week': 7 * 86400,
+                 'month': 30 * 86400, 'year': 365 * 86400}
+
+_conn = None
+_conn_lock = threading.Lock()
+
+
+def _connect():
+    """Open the history database on first use (call with _conn_lock held)"""
+    global _conn
+    if _conn is None:
+        os.makedirs(os.path.dirname(HISTORY_PATH), exist_ok=True)
+        conn = sqlite3.connect(HISTORY_PATH, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        # One row per article and ticker, timed by publication; an article
+        # seen again on a later run keeps its first score. Rows of articles
+        # without a publication date have timestamp = recorded_at.
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS articles (
+                ticker TEXT NOT NULL,
+                timestamp REAL NOT NULL,
+                recorded_at REAL NOT NULL,
+                url TEXT NOT NULL,
+                title TEXT,
+                label TEXT NOT NULL,
+                raw_score REAL NOT NULL,
+                confidence REAL NOT NULL,
+                cluster_size INTEGER NOT NULL,
+                PRIMARY KEY (ticker, url)
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS articles_ticker_timestamp ON articles (ticker, timestamp)')
+        # One row per analysis run
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS aggregates (
+                ticker TEXT NOT NULL,
+                recorded_at REAL NOT NULL,
+                final_score REAL NOT NULL,
+                sentiment_label TEXT NOT NULL,
+                confidence REAL NOT NULL,
+                total_articles INTEGER NOT NULL,
+                positive_count INTEGER NOT NULL,
+                negative_count INTEGER NOT NULL,
+                neutral_count INTEGER NOT NULL
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS aggregates_ticker_recorded_at ON aggregates (ticker, recorded_at)')
+        conn.commit()
+        _conn = conn
+    return _conn
+
+
+def _relative_epoch(value, now):
+    """Epoch seconds of an age like "3 days ago" or "yesterday", counted back from now, or None"""
+    if not isinstance(value, str):
+        return None
+    if value.strip().lower() == 'yesterday':
+        return now - _UNIT_SECONDS['day']
+    match = _RELATIVE_TIME.match(value)
+    if match is None:
+        return None
+    count, unit = match.groups()
+    count = int(count) if count.isdigit() else 1
+    unit = unit.lower()
+    seconds = next(seconds for prefix, seconds in _UNIT_SECONDS.items() if unit.startswith(prefix))
+    return now - count * seconds
+
+
+def _epoch(value):
+    """Epoch seconds of a date, datetime or date string (naive times are UTC), or None"""
+    if value is None or value == "":
+        return None
+    try:
+        parsed = pd.to_datetime(value, utc=True)
+    except (ValueError, TypeError, OverflowError):
+        return None
+    return None if pd.isna(parsed) else parsed.timestamp()
+
+
+def _bound(value):
+    """Query bound as epoch seconds; None means unbounded"""
+    if value is None:
+        return None
+    return _epoch(value) if not isinstance(value, (int, float)) else float(value)
+
+
+def record(ticker, articles, sentiment_result, recorded_at=None):
+    """
+    Append one analysis to the history
+
+    Args:
+        ticker (str): Stock ticker
+        articles (list): Condensed articles, each with its 'sentiment' result
+        sentiment_result (dict): Aggregate from sentiment.aggregate_sentiment
+        recorded_at (float): Epoch seconds of the analysis (default: now)
+    """
+    if not HISTORY_ENABLED:
+        return
+    recorded_at = time.time() if recorded_at is None else recorded_at
+
+    article_rows = []
+    for article in articles:
+        sentiment = article.get("sentiment")
+        if sentiment is None or not article.get("url"):
+            continue
+        # Articles without a usable publication date are placed at the time of the run
+        published_at = article.get("published_at")
+        timestamp = (_epoch(article.get("publish_date")) or _relative_epoch(published_at, recorded_at)
+                     or _epoch(published_at) or recorded_at)
+        article_rows.append((
+            ticker, timestamp, recorded_at, article["url"], article.get("title"), sentiment["label"],
+            float(sentiment["raw_score"]), float(sentiment["confidence"]), int(article.get("cluster_size", 1)),
+        ))
+
+    with _conn_lock:
+        conn = _connect()
+        # A later run that finds the publication date fixes an undated row's time
+        conn.executemany('''
+            INSERT INTO articles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (ticker, url) DO UPDATE SET timestamp = excluded.timestamp
+            WHERE articles.timestamp = articles.recorded_at AND excluded.timestamp != excluded.recorded_at
+        ''', article_rows)
+        if sentiment_result is not None:
+            conn.execute(
+                'INSERT INTO aggregates VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (ticker, recorded_at, float(sentiment_result["final_score"]), sentiment_result["sentiment_label"],
+                 float(sentiment_result["confidence"]), int(sentiment_result["total_articles"]),
+                 int(sentiment_result["positive_count"]), int(sentiment_result["negative_count"]),
+                 int(sentiment_result["neutral_count"]))
+            )
+        conn.commit()
+    metrics.increment('history_rows', value=len(article_rows), table='articles')
+
+
+def _range_query(table, time_column, columns, ticker, start, end):
+    clauses = ['ticker = ?']
+    params = [ticker]
+    for operator, bound in (('>=', _bound(start)), ('<=', _bound(end))):
+        if bound is not None:
+            clauses.append(f'{time_column} {operator} ?')
+            params.append(bound)
+    sql = f'SELECT {", ".join(columns)} FROM {table} WHERE {" AND ".join(clauses)} ORDER BY {time_column}'
+    with _conn_lock:
+        rows = _connect().execute(sql, params).fetchall()
+    frame = pd.DataFrame(rows, columns=columns)
+    for column in ('timestamp', 'recorded_at'):
+        if column in frame:
+            frame[column] = pd.to_datetime(frame[column], unit='s')
+    return frame
+
+
+def load_articles(ticker, start=None, end=None):
+    """
+    Stored per-article scores of a ticker, by publication time
+
+    Args:
+        ticker (str): Stock ticker
+        start, end (datetime, str or epoch seconds): Inclusive time range; None leaves it open
+
+    Returns:
+        DataFrame: ARTICLE_COLUMNS, oldest first, times as naive UTC datetimes
+    """
+    return _range_query('articles', 'timestamp', ARTICLE_COLUMNS, ticker, start, end)
+
+
+def load_aggregates(ticker, start=None, end=None):
+    """Stored aggregate results of a ticker, one row per analysis, oldest first (see load_articles)"""
+    return _range_query('aggregates', 'recorded_at', AGGREGATE_COLUMNS, ticker, start, end)
+
+
+def resample(ticker, start=None, end=None, freq='D'):
+    """
+    Confidence-weighted mean sentiment of a ticker's stored articles per period
+
+    Articles are weighted the way sentiment.aggregate_sentiment weights them
+    (confidence times dedup.cluster_weight), so a period's score matches what
+    an analysis of just those articles would report.
+
+    Args:
+        ticker (str): Stock ticker
+        start, end: See load_articles
+        freq (str): pandas offset alias, e.g. 'D' (daily) or 'h' (hourly)
+
+    Returns:
+        DataFrame: 'timestamp', 'score' (0-100), 'articles' and 'confidence'
+            (mean) for each period with at least one article
+    """
+    articles = load_articles(ticker, start, end)
+    if articles.empty:
+        return pd.DataFrame(columns=['timestamp', 'score', 'articles', 'confidence'])
+
+    weight = articles['confidence'] * articles['cluster_size'].map(dedup.cluster_weight)
+    frame = pd.DataFrame({
+        'timestamp': articles['timestamp'],
+        'weight': weight,
+        'weighted_score': articles['raw_score'] * weight,
+        'confidence': articles['confidence'],
+        'articles': 1,
+    })
+    periods = frame.set_index('timestamp').resample(freq).agg(
+        {'weight': 'sum', 'weighted_score': 'sum', 'confidence': 'mean', 'articles': 'sum'}
+    )
+    periods = periods[periods['articles'] > 0]
+    # -1 maps to 0, 0 maps to 50, 1 maps to 100, as in aggregate_sentiment
+    periods['score'] = (periods['weighted_score'] / periods['weight'].where(periods['weight'] > 0) + 1) / 2 * 100
+    return periods.reset_index()[['timestamp', 'score', 'articles', 'confidence']]
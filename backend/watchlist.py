@@ -0,0 +1,170 @@
+"""
+Keep a watchlist's news analysis precomputed so the dashboard can read it instantly.
+
+    python -m backend.watchlist watchlist.txt --interval 900
+    python -m backend.watchlist watchlist.txt --once
+
+Every interval, tickers whose stored result is older than --max-age are run
+through the pipeline and saved. The dashboard uses a stored result when it
+is fresh enough and recomputes on demand otherwise.
+"""
+import argparse
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+from backend import cache, gemini_analysis, metrics, pipeline, sentiment
+
+STORE_PATH = os.path.join(cache.CACHE_DIR, 'watchlist.sqlite3')
+
+# Stored results younger than this are served without recomputing
+MAX_AGE = int(os.getenv('WATCHLIST_MAX_AGE', str(30 * 60)))
+
+# Result fields worth storing; price history lives in the price store instead
+STORED_FIELDS = ["articles", "condensed_articles", "sentiment_result", "market_summary", "timings"]
+
+_conn = None
+_conn_lock = threading.Lock()
+
+
+def _connect():
+    """Open the results database on first use (call with _conn_lock held)"""
+    global _conn
+    if _conn is None:
+        os.makedirs(os.path.dirname(STORE_PATH), exist_ok=True)
+        conn = sqlite3.connect(STORE_PATH, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS results (
+                ticker TEXT NOT NULL,
+                mode TEXT NOT NULL,
+                computed_at REAL NOT NULL,
+                result BLOB NOT NULL,
+                PRIMARY KEY (ticker, mode)
+            )
+        ''')
+        conn.commit()
+        _conn = conn
+    return _conn
+
+
+def _mode(score_full_text, local_only=False):
+    mode = 'full_text' if score_full_text else 'condensed'
+    return f'{mode}_local' if local_only else mode
+
+
+def save_result(result, score_full_text=False, local_only=False):
+    """
+    Store the news side of a pipeline result
+
+    Failed analyses are not stored, so the next reader recomputes them.
+    """
+    if result.get("error") is not None or result.get("analysis_error") is not None:
+        return
+    stored = {field: result.get(field) for field in STORED_FIELDS}
+    with _conn_lock:
+        conn = _connect()
+        conn.execute(
+            'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)',
+            (result["ticker"], _mode(score_full_text, local_only), time.time(),
+             sqlite3.Binary(pickle.dumps(stored, protocol=pickle.HIGHEST_PROTOCOL)))
+        )
+        conn.commit()
+
+
+def load_result(ticker, max_age=MAX_AGE, score_full_text=False, local_only=False):
+    """
+    Stored news analysis for a ticker if it is fresh enough
+
+    Returns:
+        dict: Stored result fields plus 'computed_at' (epoch seconds), or None
+    """
+    with _conn_lock:
+        row = _connect().execute(
+            'SELECT computed_at, result FROM results WHERE ticker = ? AND mode = ?',
+            (ticker, _mode(score_full_text, local_only))
+        ).fetchone()
+    if row is None or time.time() - row[0] > max_age:
+        return None
+    stored = pickle.loads(row[1])
+    stored["computed_at"] = row[0]
+    return stored
+
+
+def clear_results(tickers=None):
+    """Forget the stored results of some tickers (all modes), or of every ticker"""
+    with _conn_lock:
+        conn = _connect()
+        if tickers is None:
+            conn.execute('DELETE FROM results')
+        else:
+            conn.executemany('DELETE FROM results WHERE ticker = ?', [(ticker,) for ticker in tickers])
+        conn.commit()
+
+
+def stale_tickers(tickers, max_age=MAX_AGE, score_full_text=False, local_only=False):
+    """Tickers without a stored result younger than max_age"""
+    return [ticker for ticker in tickers if load_result(ticker, max_age, score_full_text, local_only) is None]
+
+
+def refresh(tickers, max_age=MAX_AGE, max_workers=pipeline.DEFAULT_WORKERS, score_full_text=False,
+            local_only=False):
+    """Run the pipeline for stale tickers and store the results; returns the tickers refreshed"""
+    stale = stale_tickers(tickers, max_age, score_full_text, local_only)
+    if not stale:
+        return []
+
+    end = datetime.combine(date.today(), datetime.max.time())
+    start = datetime.combine(date.today() - timedelta(days=20), datetime.min.time())
+    for result in pipeline.run_pipeline(stale, start, end, max_workers=max_workers,
+                                        score_full_text=score_full_text, local_only=local_only):
+        save_result(result, score_full_text, local_only)
+    return stale
+
+
+def main(argv=None):
+    from backend.cli import read_tickers
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('watchlist_file', help='File with one ticker per line')
+    parser.add_argument('--interval', type=int, default=MAX_AGE // 2,
+                        help='Seconds between refresh passes')
+    parser.add_argument('--max-age', type=int, default=MAX_AGE,
+                        help='Recompute results older than this many seconds')
+    parser.add_argument('--workers', type=int, default=pipeline.DEFAULT_WORKERS)
+    parser.add_argument('--once', action='store_true', help='Run one refresh pass and exit')
+    parser.add_argument('--local-only', action='store_true', default=gemini_analysis.LOCAL_ONLY,
+                        help='Condense and summarize locally without calling Gemini')
+    parser.add_argument('--metrics', help='Rewrite Prometheus metrics to this file after every pass '
+                                          '(e.g. for the node_exporter textfile collector)')
+    args = parser.parse_args(argv)
+
+    # Load FinBERT before the first pass, rather than inside the first ticker's time budget
+    sentiment.warm_up()
+    while True:
+        # Re-read the file each pass so watchlist edits take effect without a restart
+        tickers = read_tickers(args.watchlist_file)
+        started = time.perf_counter()
+        try:
+            refreshed = refresh(tickers, args.max_age, args.workers, local_only=args.local_only)
+            print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] refreshed {len(refreshed)}/{len(tickers)} tickers "
+                  f"in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+        except Exception as e:
+            metrics.count_failure('watchlist_refresh', e)
+            print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] refresh failed: {e}", file=sys.stderr)
+
+        if args.metrics:
+            # Write then rename so a scraper never reads a half-written file
+            metrics.write_metrics(args.metrics + '.tmp')
+            os.replace(args.metrics + '.tmp', args.metrics)
+
+        if args.once:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,526 @@
+"""
+Offline end-to-end benchmark of the full pipeline for 1, 10 and 100 tickers.
+
+Search pages, RSS feeds and article pages are served by a local stub HTTP
+server, Gemini is replaced by a deterministic fake and Yahoo Finance by
+synthetic bars, so a run needs no network access:
+
+    python benchmarks/end_to_end.py
+    python benchmarks/end_to_end.py --sizes 1 10 100 --output e2e.json
+    python benchmarks/end_to_end.py --finbert-model ./models/finbert --warm
+    python benchmarks/end_to_end.py --fake-finbert --compare e2e.json
+    python benchmarks/end_to_end.py --fake-finbert --local-only
+
+FinBERT runs for real (set --finbert-model to a local or smaller checkpoint);
+--fake-finbert swaps in a deterministic keyword scorer for machines without
+torch. Each size runs in its own subprocess with an empty cache directory, so
+runs don't share caches or loaded models. The JSON report lists wall time,
+time to first article and first result, throughput, and per-stage span
+latencies (count, mean, p50, p95, max) from backend.metrics.
+
+With --compare, the report is checked against an earlier one and the script
+exits with status 1 if wall time or any stage's mean latency grew by more
+than --tolerance.
+"""
+import argparse
+import asyncio
+import email.utils
+import functools
+import json
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlsplit
+from xml.sax.saxutils import escape
+
+ROOT = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+sys.path.insert(0, ROOT)
+
+SENTENCES = os.path.join(os.path.dirname(__file__), 'fixtures', 'finbert_parity.txt')
+
+DEFAULT_SIZES = [1, 10, 100]
+
+# Stories per ticker: unique ones, one sector roundup shared with other
+# tickers, and one syndicated copy of the ticker's first story
+UNIQUE_STORIES = 3
+SECTOR_ROUNDUPS = 3
+
+# Every tenth ticker gets an empty search page, exercising the RSS fallback
+RSS_FALLBACK_EVERY = 10
+
+SOURCES = ['Reuters', 'CNBC', 'Bloomberg', 'MarketWatch', 'Yahoo Finance', 'Barron\'s']
+TITLE_TEMPLATES = [
+    '{name} shares {move} as quarterly revenue {verb} expectations',
+    '{name} {move} after analysts revise price targets',
+    'Investors weigh {name} guidance as margins {verb} forecasts',
+    '{name} supplier commentary sends stock {move}',
+    'What {name} earnings mean for the rest of the sector',
+]
+
+# Markup mirrors the recorded pages in fixtures/google_news_search*.html
+SEARCH_RESULT = (
+    '<div class="SoaBEf" data-hveid="CA{i}QAA"><div class="WlydOe">'
+    '<a jsname="YKoRaf" class="WlydOe" href="{url}"><div class="SoAPf">'
+    '<div class="MgUUmf NUnG9d"><span>{source}</span></div>'
+    '<div class="n0jPhd ynAwRc MBeuO nDgy9d" role="heading" aria-level="3">{title} - {source}</div>'
+    '<div class="GI74Re nDgy9d">{snippet}</div>'
+    '<div class="OSrXXb rbYSKb LfVVr"><span>{age} hours ago</span></div>'
+    '</div></a></div></div>'
+)
+SEARCH_PAGE = (
+    '<!doctype html><html lang="en"><head><meta charset="UTF-8"><title>{query} - Google Search</title></head>'
+    '<body><div id="rso">{results}</div></body></html>'
+)
+RSS_ITEM = '<item><title>{title} - {source}</title><link>{url}</link><pubDate>{date}</pubDate></item>'
+RSS_FEED = (
+    '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+    '<title>"{query}" - Google News</title>{items}</channel></rss>'
+)
+ARTICLE_PAGE = (
+    '<!doctype html><html><head><meta charset="utf-8"><title>{title}</title>'
+    '<meta property="og:title" content="{title}">'
+    '<meta property="article:published_time" content="{published}">'
+    '<meta name="author" content="{source} Staff"></head>'
+    '<body><header><nav>Markets | Tech | Economy</nav></header>'
+    '<article><h1>{title}</h1>{paragraphs}</article>'
+    '<footer>&copy; {source}</footer></body></html>'
+)
+
+
+class Corpus:
+    """Deterministic search results and article pages for synthetic tickers T000, T001, ..."""
+
+    def __init__(self, sentences, base_url):
+        self.sentences = sentences
+        self.base_url = base_url
+
+    @staticmethod
+    def ticker_index(query):
+        return int(query.split()[0].lstrip('T'))
+
+    def stories(self, ticker_index):
+        """Story ids the ticker's search returns; '-wire' copies share their original's text"""
+        ticker = f"T{ticker_index:03d}"
+        stories = [f"{ticker}-{k}" for k in range(UNIQUE_STORIES)]
+        stories.append(f"sector-{ticker_index % SECTOR_ROUNDUPS}")
+        stories.append(f"{ticker}-0-wire")
+        return stories
+
+    def _rng(self, story_id):
+        return random.Random(zlib.crc32(story_id.encode()))
+
+    def title(self, story_id):
+        # Syndicated copies get their own headline, so only their text gives them away
+        rng = self._rng(story_id)
+        name = story_id.split('-')[0] if not story_id.startswith('sector') else 'Tech sector'
+        return rng.choice(TITLE_TEMPLATES).format(
+            name=name, move=rng.choice(['rises', 'falls', 'slips', 'jumps']),
+            verb=rng.choice(['beats', 'misses', 'tops', 'trails']),
+        )
+
+    def source(self, story_id):
+        return self._rng(story_id + ':source').choice(SOURCES)
+
+    def url(self, story_id):
+        return f"{self.base_url}/article/{story_id}?utm_source=gn"
+
+    def search_page(self, query):
+        index = self.ticker_index(query)
+        results = []
+        if index % RSS_FALLBACK_EVERY != RSS_FALLBACK_EVERY - 1:
+            for i, story_id in enumerate(self.stories(index)):
+                results.append(SEARCH_RESULT.format(
+                    i=i, url=self.url(story_id), source=escape(self.source(story_id)),
+                    title=escape(self.title(story_id)), snippet=escape(self.sentences[i % len(self.sentences)]),
+                    age=i + 1,
+                ))
+        return SEARCH_PAGE.format(query=escape(query), results=''.join(results)), 'text/html; charset=utf-8'
+
+    def rss_feed(self, query):
+        index = self.ticker_index(query)
+        published = email.utils.formatdate(usegmt=True)
+        items = ''.join(
+            RSS_ITEM.format(title=escape(self.title(story_id)), source=escape(self.source(story_id)),
+                            url=escape(self.url(story_id)), date=published)
+            for story_id in self.stories(index)
+        )
+        return RSS_FEED.format(query=escape(query), items=items), 'application/rss+xml; charset=utf-8'
+
+    def article_page(self, story_id):
+        body_id = story_id.replace('-wire', '')
+        rng = self._rng(body_id + ':body')
+        paragraphs = []
+        for _ in range(rng.randint(4, 7)):
+            paragraphs.append('<p>' + ' '.join(escape(rng.choice(self.sentences)) for _ in range(3)) + '</p>')
+        html = ARTICLE_PAGE.format(
+            title=escape(self.title(story_id)), source=escape(self.source(story_id)),
+            published=date.today().isoformat(), paragraphs=''.join(paragraphs),
+        )
+        return html, 'text/html; charset=utf-8'
+
+
+def start_stub_server(corpus_factory, latency):
+    """Serve the corpus on an ephemeral localhost port; returns (server, base_url)"""
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # Keep-alive, like the real sites
+
+        def do_GET(self):
+            if latency:
+                time.sleep(latency)
+            parts = urlsplit(self.path)
+            query = parse_qs(parts.query).get('q', [''])[0].replace('+', ' ')
+            if parts.path == '/search':
+                body, content_type = corpus.search_page(query)
+            elif parts.path == '/rss':
+                body, content_type = corpus.rss_feed(query)
+            elif parts.path.startswith('/article/'):
+                body, content_type = corpus.article_page(parts.path[len('/article/'):])
+            else:
+                self.send_response(404)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+            payload = body.encode('utf-8')
+            etag = f'"{zlib.crc32(payload):08x}"'
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(payload)))
+            self.send_header('ETag', etag)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.daemon_threads = True
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    corpus = corpus_factory(base_url)
+    threading.Thread(target=server.serve_forever, name='stub-http', daemon=True).start()
+    return server, base_url
+
+
+class FakeGemini:
+    """Deterministic stand-in for genai.GenerativeModel with a fixed response latency"""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    async def generate_content_async(self, prompt):
+        await asyncio.sleep(self.latency)
+        if 'Condense this news article' in prompt:
+            content = prompt.split('Content:', 1)[1].split('Requirements:', 1)[0]
+            text = ' '.join(content.split()[:120])
+        else:
+            titles = [line.split('Title:', 1)[1].strip() for line in prompt.splitlines() if 'Title:' in line]
+            text = (
+                "**Overall Market Sentiment**: Neutral\n\n**Key Themes**: "
+                + '; '.join(titles[:5])
+                + "\n\n**Market Impact**: Limited.\n\n**Risk Factors**: Margins.\n\n**Investment Outlook**: Steady."
+            )
+        return SimpleNamespace(text=text)
+
+
+class FakeTokenizer:
+    """Whitespace tokenizer with the two methods the FinBERT helpers use"""
+
+    POSITIVE = {'beat', 'beats', 'growth', 'rise', 'rises', 'record', 'strong', 'gain', 'gains', 'raised', 'tops'}
+    NEGATIVE = {'miss', 'misses', 'loss', 'losses', 'decline', 'falls', 'weak', 'cut', 'cuts', 'warns', 'slips'}
+
+    def _ids(self, text, max_length):
+        ids = [101]
+        for word in text.lower().split():
+            word = word.strip('.,;:!?()"\'')
+            if word in self.POSITIVE:
+                ids.append(1)
+            elif word in self.NEGATIVE:
+                ids.append(2)
+            else:
+                ids.append(3 + zlib.crc32(word.encode()) % 29000)
+        return ids[:max_length - 1] + [102]
+
+    def __call__(self, texts, truncation=True, max_length=512, **kwargs):
+        if isinstance(texts, str):
+            return {'input_ids': self._ids(texts, max_length)}
+        return {'input_ids': [self._ids(text, max_length) for text in texts]}
+
+    def pad(self, encoded, return_tensors='np'):
+        import numpy as np
+
+        rows = encoded['input_ids']
+        width = max(len(row) for row in rows)
+        input_ids = np.zeros((len(rows), width), dtype=np.int64)
+        attention_mask = np.zeros((len(rows), width), dtype=np.int64)
+        for i, row in enumerate(rows):
+            input_ids[i, :len(row)] = row
+            attention_mask[i, :len(row)] = 1
+        return {'input_ids': input_ids, 'attention_mask': attention_mask}
+
+
+class FakeFinbertEngine:
+    """Keyword-count scorer behind the sentiment engine interface (truncated mode only)"""
+
+    name = 'fake'
+    id2label = {0: 'positive', 1: 'negative', 2: 'neutral'}
+
+    def __init__(self):
+        self.tokenizer = FakeTokenizer()
+
+    def logits(self, batch):
+        import numpy as np
+
+        ids = batch['input_ids'] * batch['attention_mask']
+        positive = (ids == 1).sum(axis=1)
+        negative = (ids == 2).sum(axis=1)
+        return np.stack([positive, negative, np.full(len(ids), 0.5)], axis=1).astype(np.float32)
+
+
+def synthetic_download(tickers, start, end):
+    """yf.download-shaped frame of deterministic daily bars"""
+    import numpy as np
+    import pandas as pd
+
+    index = pd.bdate_range(start, end - timedelta(days=1), name='Date')
+    frames = {}
+    for ticker in tickers:
+        rng = np.random.RandomState(zlib.crc32(ticker.encode()))
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(index))))
+        frames[ticker] = pd.DataFrame({
+            'Open': close, 'High': close * 1.01, 'Low': close * 0.99, 'Close': close,
+            'Volume': rng.randint(1_000_000, 5_000_000, len(index)),
+            'Dividends': 0.0, 'Stock Splits': 0.0,
+        }, index=index)
+    return pd.concat(frames, axis=1)
+
+
+def synthetic_metrics(ticker):
+    return {'market_cap': 1e9 + zlib.crc32(ticker.encode()), 'volume': 2_000_000}
+
+
+def _span_stats(events):
+    """Latency summary per span name from backend.metrics timeline events"""
+    durations = {}
+    for event in events:
+        if event['ph'] == 'X':
+            durations.setdefault(event['name'], []).append(event['dur'] / 1e6)
+
+    stats = {}
+    for name, values in sorted(durations.items()):
+        values.sort()
+        stats[name] = {
+            'count': len(values),
+            'total': round(sum(values), 4),
+            'mean': round(statistics.mean(values), 5),
+            'p50': round(values[len(values) // 2], 5),
+            'p95': round(values[min(len(values) - 1, int(len(values) * 0.95))], 5),
+            'max': round(values[-1], 5),
+        }
+    return stats
+
+
+def measure_pass(pipeline, metrics, tickers, workers, fetch_market, local_only=False):
+    """Run the pipeline once over tickers and summarize what happened"""
+    metrics.reset()
+    end = datetime.combine(date.today(), datetime.max.time())
+    start = datetime.combine(date.today() - timedelta(days=20), datetime.min.time())
+
+    first_article = first_result = None
+    statuses = {}
+    stage_totals = {}
+    articles_found = articles_analyzed = 0
+    started = time.perf_counter()
+    events = pipeline.iter_pipeline_events(tickers, start, end, max_workers=workers, fetch_market=fetch_market,
+                                           local_only=local_only)
+    for kind, _, payload in events:
+        elapsed = time.perf_counter() - started
+        if kind == 'article' and first_article is None:
+            first_article = elapsed
+        if kind != 'done':
+            continue
+        if first_result is None:
+            first_result = elapsed
+        record = pipeline.result_to_record(payload)
+        statuses[record['status']] = statuses.get(record['status'], 0) + 1
+        articles_found += record['articles_found']
+        articles_analyzed += record['articles_analyzed']
+        for stage in pipeline.STAGES:
+            if stage != 'market_data' and record[f'time_{stage}'] is not None:
+                stage_totals[stage] = round(stage_totals.get(stage, 0.0) + record[f'time_{stage}'], 4)
+        stage_totals['market_data'] = record['time_market_data']
+    wall = time.perf_counter() - started
+
+    return {
+        'wall_seconds': round(wall, 4),
+        'time_to_first_article': round(first_article, 4) if first_article is not None else None,
+        'time_to_first_result': round(first_result, 4) if first_result is not None else None,
+        'tickers_per_second': round(len(tickers) / wall, 3),
+        'articles_per_second': round(articles_analyzed / wall, 3),
+        'articles_found': articles_found,
+        'articles_analyzed': articles_analyzed,
+        'statuses': statuses,
+        'stage_seconds': stage_totals,
+        'spans': _span_stats(metrics.timeline()),
+        'counters': metrics.snapshot()['counters'],
+    }
+
+
+def run_size(size, args):
+    """Benchmark one ticker count in this process (called in a fresh subprocess)"""
+    with open(SENTENCES, encoding='utf-8') as f:
+        sentences = [line.strip() for line in f if line.strip()]
+
+    # Settings read at import time, so they go in before the backend is imported
+    cache_dir = tempfile.mkdtemp(prefix='n2s-e2e-')
+    os.environ['NEWS2SENTIMENT_CACHE_DIR'] = cache_dir
+    os.environ['GEMINI_REQUESTS_PER_MINUTE'] = str(args.gemini_rpm)
+    os.environ['GEMINI_MAX_IN_FLIGHT'] = str(args.gemini_in_flight)
+    if args.finbert_model:
+        os.environ['FINBERT_MODEL_ID'] = args.finbert_model
+
+    from backend import gemini_analysis, market_data, metrics, pipeline, rss_scraping, sentiment
+
+    server, base_url = start_stub_server(lambda url: Corpus(sentences, url), args.http_latency / 1000)
+    rss_scraping.GOOGLE_SEARCH_URL = base_url + '/search?q={query}'
+    rss_scraping.GOOGLE_NEWS_RSS_URL = base_url + '/rss?q={query}'
+    gemini_analysis.model = FakeGemini(args.gemini_latency / 1000)
+    # Every publisher is served from the one stub host
+    gemini_analysis.MAX_PER_HOST = gemini_analysis.MAX_WORKERS
+
+    if args.fake_finbert:
+        sentiment._engines['fake'] = FakeFinbertEngine()
+        sentiment.SENTIMENT_ENGINE = 'fake'
+    started = time.perf_counter()
+    sentiment.warm_up()
+    load_seconds = time.perf_counter() - started
+
+    fetch_market = functools.partial(
+        market_data.fetch_market_data, download=synthetic_download, fetch_metrics=synthetic_metrics
+    )
+    tickers = [f"T{i:03d}" for i in range(size)]
+    report = {
+        'tickers': size,
+        'model_load_seconds': round(load_seconds, 3),
+        'cold': measure_pass(pipeline, metrics, tickers, args.workers, fetch_market, args.local_only),
+    }
+    if args.warm:
+        # Same tickers again: article cache, ETag revalidation and the FinBERT memo all apply
+        report['warm'] = measure_pass(pipeline, metrics, tickers, args.workers, fetch_market, args.local_only)
+    # ru_maxrss is reported in kilobytes on Linux
+    report['peak_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    server.shutdown()
+    return report
+
+
+def compare(baseline, current, tolerance, min_seconds=0.005):
+    """Regressions of current against baseline, as human-readable lines"""
+    regressions = []
+    for size, run in current['runs'].items():
+        previous = baseline.get('runs', {}).get(size)
+        if previous is None:
+            continue
+        for phase in ('cold', 'warm'):
+            if phase not in run or phase not in previous:
+                continue
+            pairs = [('wall_seconds', previous[phase]['wall_seconds'], run[phase]['wall_seconds'])]
+            for name, stats in run[phase]['spans'].items():
+                if name in previous[phase]['spans']:
+                    pairs.append((f"span {name} mean", previous[phase]['spans'][name]['mean'], stats['mean']))
+            for label, before, after in pairs:
+                if after - before > max(min_seconds, before * tolerance):
+                    regressions.append(
+                        f"{size} tickers {phase}: {label} {before:.4f}s -> {after:.4f}s "
+                        f"(+{(after / before - 1) * 100 if before else float('inf'):.0f}%)"
+                    )
+    return regressions
+
+
+def _child_args(args, size):
+    """Command line re-running this script for one size"""
+    argv = [
+        '--workers', str(args.workers),
+        '--http-latency', str(args.http_latency),
+        '--gemini-latency', str(args.gemini_latency),
+        '--gemini-rpm', str(args.gemini_rpm),
+        '--gemini-in-flight', str(args.gemini_in_flight),
+        '--run-size', str(size),
+    ]
+    if args.warm:
+        argv.append('--warm')
+    if args.fake_finbert:
+        argv.append('--fake-finbert')
+    if args.local_only:
+        argv.append('--local-only')
+    if args.finbert_model:
+        argv += ['--finbert-model', args.finbert_model]
+    return argv
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='Ticker counts to run')
+    parser.add_argument('--workers', type=int, default=4, help='Tickers analyzed at the same time')
+    parser.add_argument('--warm', action='store_true', help='Also time a second pass with warm caches')
+    parser.add_argument('--fake-finbert', action='store_true', help='Use a deterministic keyword scorer')
+    parser.add_argument('--finbert-model', help='Hub id or local path of the FinBERT checkpoint')
+    parser.add_argument('--local-only', action='store_true', help='Condense and summarize without Gemini')
+    parser.add_argument('--http-latency', type=float, default=20.0, help='Stub server latency per request (ms)')
+    parser.add_argument('--gemini-latency', type=float, default=300.0, help='Fake Gemini latency per call (ms)')
+    parser.add_argument('--gemini-rpm', type=int, default=100000, help='Gemini requests per minute allowed')
+    parser.add_argument('--gemini-in-flight', type=int, default=8, help='Concurrent Gemini calls allowed')
+    parser.add_argument('--output', '-o', help='Also write the JSON report here')
+    parser.add_argument('--compare', help='Earlier JSON report to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed slowdown before failing (0.2 = 20%%)')
+    parser.add_argument('--run-size', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_size is not None:
+        print(json.dumps(run_size(args.run_size, args)))
+        return
+
+    report = {
+        'config': {key: value for key, value in vars(args).items() if key not in ('run_size', 'output', 'compare')},
+        'python': sys.version.split()[0],
+        'runs': {},
+    }
+    for size in args.sizes:
+        completed = subprocess.run(
+            [sys.executable, __file__, *_child_args(args, size)],
+            capture_output=True, text=True, check=True,
+        )
+        report['runs'][str(size)] = json.loads(completed.stdout.strip().splitlines()[-1])
+        cold = report['runs'][str(size)]['cold']
+        print(f"{size:>4} tickers: {cold['wall_seconds']:.2f}s, first result after "
+              f"{cold['time_to_first_result']}s, {cold['articles_per_second']} articles/s", file=sys.stderr)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Compare FinBERT inference engines for accuracy parity, latency and memory.
+
+Each engine runs in its own subprocess so peak RSS is measured separately:
+
+    python benchmarks/finbert_engines.py
+    python benchmarks/finbert_engines.py --engines torch onnx --batch-size 16 --repeats 5
+
+The torch engine is the reference; the report lists how often every other
+engine predicts the same label and how far its confidence drifts.
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'finbert_parity.txt')
+
+
+def load_fixtures(path):
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def run_engine(engine_name, texts, batch_size, repeats):
+    """Score the fixtures with one engine and return predictions, timings and peak RSS"""
+    from backend import sentiment
+
+    started = time.perf_counter()
+    engine = sentiment.warm_up(engine_name)
+    load_seconds = time.perf_counter() - started
+
+    latencies = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        results = sentiment._run_model(texts, batch_size, engine)
+        latencies.append(time.perf_counter() - started)
+
+    return {
+        'engine': engine_name,
+        'load_seconds': round(load_seconds, 3),
+        'latency_seconds_median': round(statistics.median(latencies), 4),
+        'texts_per_second': round(len(texts) / statistics.median(latencies), 1),
+        # ru_maxrss is reported in kilobytes on Linux
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'predictions': [[result['label'], result['confidence']] for result in results],
+    }
+
+
+def compare(reference, candidate):
+    """Label agreement and confidence drift of a candidate engine against the reference"""
+    pairs = list(zip(reference['predictions'], candidate['predictions']))
+    agreement = sum(ref[0] == cand[0] for ref, cand in pairs) / len(pairs)
+    drift = [abs(ref[1] - cand[1]) for ref, cand in pairs if ref[0] == cand[0]]
+    return {
+        'label_agreement': round(agreement, 4),
+        'max_confidence_drift': round(max(drift), 4) if drift else None,
+        'mean_confidence_drift': round(statistics.mean(drift), 4) if drift else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--engines', nargs='+', default=['torch', 'onnx'])
+    parser.add_argument('--fixtures', default=DEFAULT_FIXTURES)
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--min-agreement', type=float, default=0.95,
+                        help='Exit with status 1 if any engine agrees with torch less than this')
+    parser.add_argument('--run-engine', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    texts = load_fixtures(args.fixtures)
+
+    # Child process: run a single engine and print its measurements as JSON
+    if args.run_engine:
+        print(json.dumps(run_engine(args.run_engine, texts, args.batch_size, args.repeats)))
+        return
+
+    reports = {}
+    for engine_name in args.engines:
+        output = subprocess.run(
+            [sys.executable, __file__, '--run-engine', engine_name, '--fixtures', args.fixtures,
+             '--batch-size', str(args.batch_size), '--repeats', str(args.repeats)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        reports[engine_name] = json.loads(output.strip().splitlines()[-1])
+
+    summary = {'fixtures': len(texts), 'engines': {}}
+    failed = False
+    for engine_name, report in reports.items():
+        entry = {key: value for key, value in report.items() if key != 'predictions'}
+        if engine_name != 'torch' and 'torch' in reports:
+            entry.update(compare(reports['torch'], report))
+            failed = failed or entry['label_agreement'] < args.min_agreement
+        summary['engines'][engine_name] = entry
+
+    print(json.dumps(summary, indent=2))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+"""
+Benchmark Google News search-result parsing on recorded HTML fixtures.
+
+Compares the parser that scrape_google_news_search used before result
+containers were strained (kept below as original_parse_search_results) with
+parse_search_results, checks both return the same results, and reports parse
+time, time relative to the original and memory allocations per page.
+
+Pages without the usual result containers ("fallback" layout, e.g. the
+legacy fixture) are parsed twice by the strained path: once strained, which
+finds nothing, then in full. The strained configurations are slower than the
+original there; the report marks each page's layout so this shows.
+
+    python benchmarks/search_parser.py
+    python benchmarks/search_parser.py --iterations 200
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from bs4 import BeautifulSoup
+from backend.rss_scraping import (HTML_PARSER, _RESULT_PATTERNS, _RESULT_STRAINER, _extract_results, clean_title,
+                                  parse_search_results)
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'google_news_search*.html')
+
+
+def original_parse_search_results(html):
+    """scrape_google_news_search's parsing before parse_search_results, unchanged"""
+    soup = BeautifulSoup(html, "html.parser")
+    news_results = []
+    
+    # Try multiple selectors in case Google changes their HTML structure
+    selectors_to_try = [
+        "div.SoaBEf",  # Original selector
+        "div[data-ved]",  # Alternative selector
+        "div.g",  # Generic Google result selector
+    ]
+    
+    for selector in selectors_to_try:
+        elements = soup.select(selector)
+        
+        if elements:
+            for el in elements[:5]:  # Limit to 5 articles
+                try:
+                    # Extract link
+                    link_element = el.find("a")
+                    if not link_element or not link_element.get("href"):
+                        continue
+                        
+                    link = link_element["href"]
+                    
+                    # Extract title
+                    title_selectors = ["div.MBeuO", "h3", "div[role='heading']", "a h3"]
+                    title = None
+                    for title_sel in title_selectors:
+                        title_elem = el.select_one(title_sel)
+                        if title_elem:
+                            title = title_elem.get_text(strip=True)
+                            break
+                    
+                    if not title:
+                        continue
+                    
+                    # Extract snippet
+                    snippet_selectors = [".GI74Re", ".s3v9rd", "span"]
+                    snippet = ""
+                    for snippet_sel in snippet_selectors:
+                        snippet_elem = el.select_one(snippet_sel)
+                        if snippet_elem:
+                            snippet = snippet_elem.get_text(strip=True)
+                            break
+                    
+                    # Extract date
+                    date_selectors = [".LfVVr", ".LEwnzc", ".f"]
+                    date = ""
+                    for date_sel in date_selectors:
+                        date_elem = el.select_one(date_sel)
+                        if date_elem:
+                            date = date_elem.get_text(strip=True)
+                            break
+                    
+                    # Extract source
+                    source_selectors = [".NUnG9d span", ".CEMjEf", ".WfABme"]
+                    source = ""
+                    for source_sel in source_selectors:
+                        source_elem = el.select_one(source_sel)
+                        if source_elem:
+                            source = source_elem.get_text(strip=True)
+                            break
+                    
+                    news_results.append({
+                        "title": clean_title(title),
+                        "url": link,
+                        "snippet": snippet,
+                        "published_at": date,
+                        "source": source
+                    })
+                    
+                except Exception as e:
+                    continue
+            
+            if news_results:
+                break  # If we found results with this selector, stop trying others
+    
+    return news_results
+
+
+# (name, parse function); the first entry is the baseline
+CONFIGURATIONS = [
+    ('original', original_parse_search_results),
+    ('html.parser full', lambda html: parse_search_results(html, parser='html.parser', strained=False)),
+    ('html.parser strained', lambda html: parse_search_results(html, parser='html.parser', strained=True)),
+    (f'{HTML_PARSER} strained', lambda html: parse_search_results(html, parser=HTML_PARSER, strained=True)),
+]
+
+
+def layout(html):
+    """'usual' if the strained parse finds results, 'fallback' if it has to parse the page again"""
+    strained = BeautifulSoup(html, 'html.parser', parse_only=_RESULT_STRAINER)
+    return 'usual' if _extract_results(strained, _RESULT_PATTERNS[:1], 5) else 'fallback'
+
+
+def measure(parse, html, iterations):
+    """Median parse time and per-parse allocations for one configuration"""
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        parse(html)
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    results = parse(html)
+    snapshot = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks = sum(stat.count for stat in snapshot.statistics('filename'))
+
+    return results, {
+        'median_ms': round(statistics.median(timings) * 1000, 3),
+        'peak_kb': round(peak / 1024, 1),
+        'live_blocks': blocks,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+
+    report = {}
+    mismatched = False
+    for path in sorted(glob.glob(FIXTURES)):
+        with open(path, 'rb') as f:
+            html = f.read()
+
+        page = {'bytes': len(html), 'layout': layout(html), 'configurations': {}}
+        baseline_results = baseline_ms = None
+        for name, parse in dict(CONFIGURATIONS).items():
+            results, stats = measure(parse, html, args.iterations)
+            if baseline_results is None:
+                baseline_results, baseline_ms = results, stats['median_ms']
+            stats['vs_baseline'] = round(stats['median_ms'] / baseline_ms, 2)
+            stats['results'] = len(results)
+            stats['matches_baseline'] = results == baseline_results
+            mismatched = mismatched or not stats['matches_baseline']
+            page['configurations'][name] = stats
+        report[os.path.basename(path)] = page
+
+        slower = [name for name, stats in page['configurations'].items()
+                  if 'strained' in name and stats['vs_baseline'] > 1]
+        if slower and page['layout'] == 'fallback':
+            print(f"{os.path.basename(path)}: {', '.join(slower)} slower than the original; "
+                  f"this layout is parsed twice (strained, then in full)", file=sys.stderr)
+
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if mismatched else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,44 +1,522 @@
 import sys
 import os
+import json
+from html import escape
+from string import Template
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from datetime import datetime, timedelta, time
 import streamlit as st
-import streamlit.components.v1 as components
 import plotly.express as px
-from backend import rss_scraping
-from backend.gemini_analysis import process_articles_with_gemini, generate_market_summary
-from backend.sentiment import calculate_final_sentiment_score, get_sentiment_color, get_sentiment_emoji
-import yfinance as yf
-
-def render_news_card(title, url, pub_date):
-    html_code = f"""
-    <div style="
-        border-radius: 36px;
-        padding: 18px;
-        margin-bottom: 18px;
-        padding-bottom: 30px;
-        background: #1e1e1e;
-        box-shadow: 0 2px 8px rgba(0,0,0,0.15);
-        font-family: 'Segoe UI', sans-serif;
-        overflow: hidden;
-        background-clip: padding-box;
-    ">
-        <h4 style="
-            font-size: 1.1em;
-            font-weight: 600;
-            margin-bottom: 8px;">
-            <a href="{url}" target="_blank" style="
-                text-decoration: none;
-                background: linear-gradient(90deg, #4DA3FF, #00FFC6);
-                -webkit-background-clip: text;
-                -webkit-text-fill-color: transparent;">
-                {title}
-            </a>
-        </h4>
-        <span style="font-size: 0.8em; color: #999;">🗓 {pub_date}</span>
+from backend import (cache, gemini_analysis, market_data, metrics, pipeline, price_store, rss_scraping, sentiment,
+                     sentiment_history, watchlist)
+from backend.sentiment import get_sentiment_color, get_sentiment_emoji, warm_up
+
+# Number of tickers analyzed at the same time
+MAX_PARALLEL_TICKERS = 4
+
+# Resolutions offered for the stored sentiment chart (pandas offset aliases)
+HISTORY_FREQUENCIES = {"Daily": "D", "Hourly": "h"}
+
+# How long the dashboard reuses a stage's result across reruns and sessions.
+# Extraction, condensation, FinBERT scores and market summaries are cached by
+# the backend itself, keyed by content.
+NEWS_TTL = 10 * 60      # fetch_news search results
+MARKET_TTL = 15 * 60    # Price history, market cap and volume
+
+
+@st.cache_resource(show_spinner="Loading FinBERT model...")
+def load_sentiment_model():
+    # Load and warm up FinBERT once per server process, shared across sessions
+    return warm_up()
+
+
+class _Uncached(Exception):
+    """Carries a failed stage's result out of a cached function, so Streamlit does not cache it"""
+
+    def __init__(self, value):
+        super().__init__()
+        self.value = value
+
+
+@st.cache_data(ttl=NEWS_TTL, show_spinner=False)
+def _cached_fetch_news(ticker, limit):
+    articles = rss_scraping.fetch_news(ticker, limit)
+    # An empty list is usually a failed search; try again on the next run
+    if not articles:
+        raise _Uncached(articles)
+    return articles
+
+
+def cached_fetch_news(ticker, limit):
+    # Called from the pipeline's worker threads; the cache is shared by every session
+    try:
+        return _cached_fetch_news(ticker, limit)
+    except _Uncached as e:
+        return e.value
+
+
+@st.cache_data(ttl=MARKET_TTL, show_spinner=False)
+def _cached_market_data(tickers, start, end):
+    market = market_data.fetch_market_data(tickers, start, end)
+    if any(data["error"] is not None for data in market.values()):
+        raise _Uncached(market)
+    return market
+
+
+def cached_market_data(tickers, start, end):
+    try:
+        return _cached_market_data(tickers, start, end)
+    except _Uncached as e:
+        return e.value
+
+
+def _compact(html):
+    """Join an HTML template onto one line, so markdown never reads its indentation as a code block"""
+    return " ".join(line.strip() for line in html.strip().splitlines() if line.strip())
+
+
+# Templates are compiled once; each ticker's cards and sentiment widgets are
+# then rendered as a single markdown block instead of one element per widget
+NEWS_CARDS_STYLE = _compact("""
+<style>
+.n2s-card {
+    border-radius: 36px;
+    padding: 18px 18px 30px 18px;
+    margin-bottom: 18px;
+    background: #1e1e1e;
+    box-shadow: 0 2px 8px rgba(0,0,0,0.15);
+    font-family: 'Segoe UI', sans-serif;
+    overflow: hidden;
+    background-clip: padding-box;
+}
+.n2s-card h4 {
+    font-size: 1.1em;
+    font-weight: 600;
+    margin-bottom: 8px;
+    padding: 0;
+}
+.n2s-card a {
+    text-decoration: none;
+    background: linear-gradient(90deg, #4DA3FF, #00FFC6);
+    -webkit-background-clip: text;
+    -webkit-text-fill-color: transparent;
+}
+.n2s-card span {
+    font-size: 0.8em;
+    color: #999;
+}
+</style>
+""")
+
+NEWS_CARD_TEMPLATE = Template(_compact("""
+<div class="n2s-card">
+    <h4><a href="$url" target="_blank">$title</a></h4>
+    <span>🗓 $pub_date</span>
+</div>
+"""))
+
+SENTIMENT_STYLE = _compact("""
+<style>
+.n2s-sentiment {
+    display: flex;
+    flex-wrap: wrap;
+    gap: 16px;
+    font-family: 'Segoe UI', sans-serif;
+}
+.n2s-sentiment h3 {
+    font-size: 1.3em;
+}
+.n2s-gauge {
+    flex: 2 1 260px;
+    display: flex;
+    flex-direction: column;
+    align-items: center;
+    padding: 20px;
+    background: linear-gradient(135deg, #1e1e1e 0%, #2d2d2d 100%);
+    border-radius: 20px;
+    box-shadow: 0 8px 32px rgba(0,0,0,0.3);
+}
+.n2s-dial {
+    width: 200px;
+    height: 200px;
+    border-radius: 50%;
+    display: flex;
+    align-items: center;
+    justify-content: center;
+    margin-bottom: 15px;
+}
+.n2s-dial-face {
+    width: 160px;
+    height: 160px;
+    border-radius: 50%;
+    background: #1e1e1e;
+    display: flex;
+    flex-direction: column;
+    align-items: center;
+    justify-content: center;
+}
+.n2s-column {
+    flex: 1 1 180px;
+}
+.n2s-count {
+    padding: 10px;
+    margin: 5px 0;
+    border-radius: 5px;
+    font-weight: bold;
+}
+.n2s-confidence {
+    background: #333;
+    border-radius: 10px;
+    padding: 15px;
+    margin: 10px 0;
+    text-align: center;
+}
+.n2s-bar {
+    background: #555;
+    border-radius: 5px;
+    height: 8px;
+    margin: 10px 0;
+    overflow: hidden;
+}
+.n2s-caption {
+    color: #999;
+    font-size: 12px;
+    text-align: center;
+}
+</style>
+""")
+
+SENTIMENT_COUNT_TEMPLATE = Template(_compact("""
+<div class="n2s-count" style="background: ${color}20; border-left: 4px solid $color; color: $color;">
+    $icon $count $label
+</div>
+"""))
+
+SENTIMENT_TEMPLATE = Template(_compact("""
+<div class="n2s-sentiment">
+    <div class="n2s-gauge" style="border: 2px solid $color;">
+        <div class="n2s-dial" style="background: conic-gradient($color 0deg, $color ${angle}deg, #333 ${angle}deg, #333 360deg);">
+            <div class="n2s-dial-face">
+                <div style="font-size: 48px; margin-bottom: 5px;">$emoji</div>
+                <div style="font-size: 32px; font-weight: bold; color: $color;">$score</div>
+                <div style="font-size: 14px; color: #999;">/ 100</div>
+            </div>
+        </div>
+        <div style="color: $color; font-size: 18px; font-weight: bold; margin-bottom: 5px;">$label</div>
+        <div style="color: #999; font-size: 14px;">Market Sentiment Score</div>
     </div>
+    <div class="n2s-column">
+        <h3>📈 Article Breakdown</h3>
+        $counts
+    </div>
+    <div class="n2s-column">
+        <h3>🎯 Analysis Confidence</h3>
+        <div class="n2s-confidence">
+            <div style="color: $confidence_color; font-size: 24px; font-weight: bold;">$confidence%</div>
+            <div class="n2s-bar"><div style="background: $confidence_color; height: 100%; width: $confidence%;"></div></div>
+            <div class="n2s-caption">Analysis Confidence</div>
+        </div>
+        <div class="n2s-confidence">
+            <div style="font-size: 24px; font-weight: bold;">$total_articles</div>
+            <div class="n2s-caption">Articles Analyzed</div>
+        </div>
+    </div>
+</div>
+"""))
+
+
+@st.cache_data(max_entries=512, show_spinner=False)
+def news_cards_html(cards):
+    """
+    HTML for a ticker's news cards, cached so reruns reuse it
+
+    Args:
+        cards (tuple): (title, url, published date) for each article
+    """
+    return NEWS_CARDS_STYLE + "".join(
+        NEWS_CARD_TEMPLATE.substitute(title=escape(title), url=escape(url), pub_date=escape(str(pub_date)))
+        for title, url, pub_date in cards
+    )
+
+
+@st.cache_data(max_entries=512, show_spinner=False)
+def sentiment_html(final_score, sentiment_label, positive_count, negative_count, neutral_count,
+                   confidence, total_articles):
+    """HTML for the sentiment gauge, article breakdown and confidence widgets, cached so reruns reuse it"""
+    color = get_sentiment_color(final_score)
+    confidence_pct = confidence * 100
+    confidence_color = "#4CAF50" if confidence_pct >= 80 else "#FF9800" if confidence_pct >= 60 else "#F44336"
+    counts = "".join(
+        SENTIMENT_COUNT_TEMPLATE.substitute(color=active_color if count > 0 else "#666",
+                                            icon=icon, count=count, label=label)
+        for icon, count, label, active_color in [
+            ("📈", positive_count, "Positive", "#4CAF50"),
+            ("📉", negative_count, "Negative", "#F44336"),
+            ("➡️", neutral_count, "Neutral", "#FF9800"),
+        ]
+    )
+    return SENTIMENT_STYLE + SENTIMENT_TEMPLATE.substitute(
+        color=color,
+        angle=final_score * 3.6,
+        emoji=get_sentiment_emoji(final_score),
+        score=f"{final_score:.0f}",
+        label=escape(sentiment_label),
+        counts=counts,
+        confidence_color=confidence_color,
+        confidence=f"{confidence_pct:.1f}",
+        total_articles=total_articles,
+    )
+
+
+def render_news_cards(articles):
+    """Render every news card for a ticker in one markdown block"""
+    cards = tuple(
+        (article.get("title") or "No Title", article.get("url") or "#",
+         article.get("published_at") or "No Published Date")
+        for article in articles
+    )
+    st.markdown(news_cards_html(cards), unsafe_allow_html=True)
+
+
+def render_sentiment_analysis(sentiment_result):
+    """Render the sentiment gauge, article breakdown and confidence widgets"""
+    st.subheader("📊 Market Sentiment Analysis")
+    st.markdown(
+        sentiment_html(
+            sentiment_result['final_score'],
+            sentiment_result['sentiment_label'],
+            sentiment_result['positive_count'],
+            sentiment_result['negative_count'],
+            sentiment_result['neutral_count'],
+            sentiment_result['confidence'],
+            sentiment_result['total_articles'],
+        ),
+        unsafe_allow_html=True,
+    )
+
+
+def render_sentiment_history(ticker, start, end, freq):
+    """Chart the stored sentiment of a ticker, resampled to freq, without recomputing anything"""
+    history = sentiment_history.resample(ticker, start, end, freq)
+    if history.empty:
+        st.info("No stored sentiment for this period yet. It builds up as the ticker is analyzed.")
+        return
+    fig_sentiment = px.line(
+        history, x="timestamp", y="score", markers=True, range_y=[0, 100],
+        hover_data=["articles", "confidence"], title=f"{ticker} News Sentiment Over Time",
+    )
+    st.plotly_chart(fig_sentiment, use_container_width=True)
+
+
+def render_market(ticker, result, history_freq="D"):
+    """Render the overview metrics, price chart and stored sentiment chart from a ticker's market data"""
+    hist = result["hist"]
+    last_price = result["last_price"]
+    market_cap = result["market_cap"]
+    volume = result["volume"]
+
+    # Row 1: Stock Overview & Sentiment
+    st.subheader(f"{ticker} - Stock Overview")
+    if result.get("computed_at"):
+        age_minutes = (datetime.now().timestamp() - result["computed_at"]) / 60
+        st.caption(f"🕒 News analysis precomputed {age_minutes:.0f} min ago")
+
+    st.metric(
+        label="Last Price",
+        value=f"${last_price:,.2f}" if last_price else "N/A"
+    )
+    st.metric(
+        label="Market Cap",
+        value=f"{market_cap / 1e12:.2f}T" if market_cap and market_cap >= 1e12 else
+        f"{market_cap / 1e9:.2f}B" if market_cap and market_cap >= 1e9 else
+        f"{market_cap / 1e6:.2f}M" if market_cap else "N/A"
+    )
+    st.metric(
+        label="Volume",
+        value=f"{volume:,}" if volume else "N/A"
+    )
+
+    st.markdown("---")
+
+    # Row 2: Price & Sentiment Charts
+    st.subheader("Price Trends")
+
+    price_col, sentiment_col = st.columns(2)
+    with price_col:
+        st.markdown("**Price Chart**")
+        if not hist.empty:
+            fig_price = px.line(hist, x="Date", y="Close", title=f"{ticker} Stock Price Over Time")
+            st.plotly_chart(fig_price, use_container_width=True)
+        else:
+            st.warning("No price data available.")
+
+    with sentiment_col:
+        st.markdown("**Sentiment Chart**")
+        # Same period as the price chart, through the end of its last day
+        start = hist["Date"].min() if not hist.empty else None
+        end = hist["Date"].max() + timedelta(days=1) if not hist.empty else None
+        render_sentiment_history(ticker, start, end, history_freq)
+
+    st.markdown("---")
+
+
+def render_news(ticker, articles):
+    """Render the news cards for the articles fetch_news returned"""
+    # Row 3: News Cards
+    st.subheader("Recent News")
+    if not articles:
+        st.warning(f"No articles found for {ticker}.")
+    else:
+        render_news_cards(articles)
+
+    st.markdown("---")
+
+
+def render_article_result(article):
+    """Render one analyzed article: its FinBERT label and the text that was scored"""
+    sentiment = article.get("sentiment")
+    if sentiment is None:
+        label = "not scored"
+    else:
+        score = (sentiment["raw_score"] + 1) * 50
+        label = f"{get_sentiment_emoji(score)} {sentiment['label']} ({sentiment['confidence']:.0%})"
+
+    copies = article.get("cluster_size", 1) - 1
+    if copies > 0:
+        label += f" · also in {copies} other {'outlet' if copies == 1 else 'outlets'}"
+
+    with st.expander(f"{article.get('title') or 'No Title'} — {label}"):
+        st.markdown(article.get("condensed_content") or (article.get("text") or "")[:1500])
+
+
+def render_running_score(placeholder, running, analyzed, total):
+    """Show the aggregate score of the articles scored so far"""
+    if running is None:
+        placeholder.info(f"⏳ Analyzed {analyzed}/{total} articles...")
+        return
+    placeholder.info(
+        f"⏳ Running score {get_sentiment_emoji(running['final_score'])} "
+        f"**{running['final_score']:.0f}/100 ({running['sentiment_label']})** "
+        f"from {running['total_articles']} scored articles ({analyzed}/{total} analyzed)"
+    )
+
+
+def render_analysis(result):
+    """Render the AI Analysis row from a finished pipeline result"""
+    # Row 4: AI Analysis (Gemini + FinBERT)
+    st.subheader("AI Analysis")
+
+    if result["analysis_error"] is not None:
+        st.error(f"Error in AI analysis: {result['analysis_error']}")
+    elif not result["articles"]:
+        st.warning("No articles available for AI analysis.")
+    elif not result["condensed_articles"]:
+        st.warning("⚠️ Could not condense articles for analysis")
+    else:
+        # Display results
+        st.success(f"✅ Analyzed {len(result['condensed_articles'])} articles successfully!")
+        for article in result["condensed_articles"]:
+            render_article_result(article)
+
+        render_sentiment_analysis(result["sentiment_result"])
+
+        # Display market summary
+        st.subheader("Market Mood Summary")
+        st.markdown(result["market_summary"])
+
+
+def render_ticker(ticker, result, history_freq="D"):
+    """Render one ticker's section from the result of pipeline.analyze_ticker"""
+    if result["error"] is not None:
+        st.error(f"Error fetching data for {ticker}: {result['error']}")
+        return
+
+    render_market(ticker, result, history_freq)
+    render_news(ticker, result["articles"])
+    render_analysis(result)
+
+
+def render_metrics():
+    """Render span timings and counters recorded by backend.metrics, with exports"""
+    with st.expander("⏱️ Pipeline metrics"):
+        st.caption("Recorded by this server process since it started.")
+        snapshot = metrics.snapshot()
+        st.dataframe(
+            [
+                {
+                    "span": name,
+                    "calls": stats["count"],
+                    "total (s)": round(stats["total"], 3),
+                    "mean (s)": round(stats["mean"], 3),
+                    "max (s)": round(stats["max"], 3),
+                    "errors": stats["errors"],
+                }
+                for name, stats in sorted(snapshot["spans"].items(), key=lambda item: -item[1]["total"])
+            ],
+            use_container_width=True,
+        )
+        st.dataframe(
+            [
+                {"counter": counter["name"],
+                 "labels": ", ".join(f"{key}={value}" for key, value in counter["labels"].items()),
+                 "value": counter["value"]}
+                for counter in snapshot["counters"]
+            ],
+            use_container_width=True,
+        )
+        col1, col2 = st.columns(2)
+        col1.download_button("Prometheus metrics", metrics.to_prometheus(),
+                             file_name="news2sentiment.prom")
+        col2.download_button("Trace timeline (JSON)", json.dumps({"traceEvents": metrics.timeline()}),
+                             file_name="news2sentiment.trace.json")
+
+
+def stream_ticker_event(kind, ticker, payload, slots):
     """
-    components.html(html_code, height=130, scrolling=False)
+    Render one pipeline.iter_pipeline_events event into a ticker's section
+
+    Articles appear as soon as they are condensed and scored, with a running
+    aggregate score; the finished analysis then replaces the streamed view.
+    """
+    if kind == "market":
+        with slots["market"]:
+            if payload["error"] is not None:
+                st.error(f"Error fetching data for {ticker}: {payload['error']}")
+            else:
+                render_market(ticker, payload, slots["history_freq"])
+                slots["status"].info(f"📰 Fetching news for {ticker}...")
+
+    elif kind == "articles":
+        with slots["news"]:
+            render_news(ticker, payload)
+        slots["total"] = min(len(payload), pipeline.ARTICLES_PER_TICKER)
+        slots["analyzed"] = 0
+        if payload:
+            slots["status"].info(f"🤖 Condensing and scoring {slots['total']} articles for {ticker}...")
+            with slots["analysis"].container():
+                st.subheader("AI Analysis")
+                slots["running"] = st.empty()
+                slots["articles"] = st.container()
+                slots["final"] = st.container()
+            render_running_score(slots["running"], None, 0, slots["total"])
+
+    elif kind == "article":
+        slots["analyzed"] += 1
+        with slots["articles"]:
+            render_article_result(payload["article"])
+        render_running_score(slots["running"], payload["running"], slots["analyzed"], slots["total"])
+
+    elif kind == "sentiment":
+        slots["running"].empty()
+        slots["status"].info(f"✍️ Writing market summary for {ticker}...")
+        with slots["final"]:
+            render_sentiment_analysis(payload)
+
+    elif kind == "done":
+        slots["status"].empty()
+        if payload["error"] is None:
+            with slots["analysis"].container():
+                render_analysis(payload)
 
 
 st.markdown(
@@ -66,310 +544,121 @@ with st.sidebar:
     st.title("News2Sentiment")
     tickers_input = st.sidebar.text_input("Enter Stock Tickers (comma-separated):", "AAPL")
     tickers = [ticker.strip().upper() for ticker in tickers_input.split(",") if ticker.strip()]
+    tickers = list(dict.fromkeys(tickers))  # Drop repeated tickers, keep order
     start_date = st.sidebar.date_input("Start Date", value=start_date_default)
     end_date = st.sidebar.date_input("End Date", value=end_date_default,max_value=datetime.today())
+    score_full_text = st.sidebar.checkbox(
+        "Score full articles (skip Gemini condensation)",
+        help="FinBERT reads each whole article in overlapping 512-token windows.",
+    )
+    local_only = st.sidebar.checkbox(
+        "Local-only analysis (no Gemini)",
+        value=gemini_analysis.LOCAL_ONLY,
+        help="Condense articles with a local extractive summarizer and build the summary "
+             "from their key points. Faster, and works when the Gemini API is slow or over quota.",
+    )
+    history_freq = HISTORY_FREQUENCIES[st.sidebar.radio(
+        "Sentiment history resolution", list(HISTORY_FREQUENCIES), horizontal=True
+    )]
+
+    with st.sidebar.expander("♻️ Caching"):
+        reuse_minutes = st.slider(
+            "Reuse news analyses up to (minutes)", 0, 240, watchlist.MAX_AGE // 60,
+            help="Analyses newer than this are shown without re-running the pipeline. 0 always recomputes.",
+        )
+        st.caption(f"Search results are reused for {NEWS_TTL // 60} min, prices for {MARKET_TTL // 60} min.")
+        if st.button("Refresh news and prices"):
+            _cached_fetch_news.clear()
+            _cached_market_data.clear()
+            # Stored daily bars are final; only market cap and volume go stale
+            price_store.clear(history=False)
+            st.success("News and prices will be fetched again.")
+        if st.button("Recompute these tickers"):
+            watchlist.clear_results(tickers)
+            st.success("Stored analyses cleared for " + ", ".join(tickers))
+        if st.button("Clear all caches", help="Also drops downloaded articles, Gemini output, FinBERT scores and stored prices on disk"):
+            st.cache_data.clear()
+            watchlist.clear_results()
+            sentiment.clear_result_cache()
+            price_store.clear()
+            cache.clear()
+            st.session_state.pop("last_analysis", None)
+            st.success("All caches cleared.")
 
 start_date = datetime.combine(start_date, time.min)
 end_date = datetime.combine(end_date, time.max)
 
 
-
 if st.sidebar.button("Analyze"):
-    for ticker in tickers:
-        try:
-            ticker_obj = yf.Ticker(ticker)
-
-            # Historical data for charts
-            hist = ticker_obj.history(start=start_date, end=end_date)
-            hist.reset_index(inplace=True)
-
-            # Last price from historical data
-            last_price = hist['Close'].iloc[-1] if not hist.empty else None
-
-            # Try fast_info first
-            fast_info = ticker_obj.fast_info
-            market_cap = getattr(fast_info, "market_cap", None)
-            volume = getattr(fast_info, "last_volume", None) or getattr(fast_info, "volume", None)
-
-            # Fallback: try .info if still missing
-            if market_cap is None or volume is None:
-                info = ticker_obj.info
-                market_cap = market_cap or info.get("marketCap", None)
-                volume = volume or info.get("volume", None)
-
-            # Final fallback: if volume missing, use historical data
-            if volume is None and not hist.empty:
-                volume = hist['Volume'].iloc[-1]
-
-
-        except Exception as e:
-            st.error(f"Error fetching data for {ticker}: {e}")
-            continue
-
+    load_sentiment_model()
 
+    # One section per ticker, in input order, filled in as each ticker finishes
+    sections = {}
+    statuses = {}
+    for ticker in tickers:
+        sections[ticker] = st.container()
+        with sections[ticker]:
+            statuses[ticker] = st.empty()
+            statuses[ticker].info(f"🚀 Analyzing {ticker}...")
 
+    # Fresh results, precomputed by the watchlist worker or an earlier run, are shown immediately
+    results = {}
+    stored = {ticker: watchlist.load_result(ticker, reuse_minutes * 60, score_full_text, local_only)
+              for ticker in tickers}
+    precomputed = [ticker for ticker in tickers if stored[ticker] is not None]
+    if precomputed:
+        market = cached_market_data(precomputed, start_date, end_date)
+        for ticker in precomputed:
+            result = {"ticker": ticker, "analysis_error": None}
+            result.update(market[ticker])
+            result.update(stored[ticker])
+            results[ticker] = result
+            statuses[ticker].empty()
+            with sections[ticker]:
+                render_ticker(ticker, result, history_freq)
 
-        # Row 1: Stock Overview & Sentiment
-        st.subheader(f"{ticker} - Stock Overview")
+    # The rest run concurrently; each section fills in as articles finish
+    stale = [ticker for ticker in tickers if stored[ticker] is None]
+    if stale:
+        slots = {}
+        for ticker in stale:
+            with sections[ticker]:
+                slots[ticker] = {
+                    "status": statuses[ticker],
+                    "market": st.container(),
+                    "news": st.container(),
+                    "analysis": st.empty(),
+                    "history_freq": history_freq,
+                }
 
-        st.metric(
-            label="Last Price",
-            value=f"${last_price:,.2f}" if last_price else "N/A"
-        )
-        st.metric(
-            label="Market Cap",
-            value=f"{market_cap / 1e12:.2f}T" if market_cap and market_cap >= 1e12 else
-            f"{market_cap / 1e9:.2f}B" if market_cap and market_cap >= 1e9 else
-            f"{market_cap / 1e6:.2f}M" if market_cap else "N/A"
+        events = pipeline.iter_pipeline_events(
+            stale, start_date, end_date,
+            max_workers=MAX_PARALLEL_TICKERS,
+            score_full_text=score_full_text,
+            local_only=local_only,
+            fetch_market=cached_market_data,
+            fetch_news=cached_fetch_news,
         )
-        st.metric(
-            label="Volume",
-            value=f"{volume:,}" if volume else "N/A"
-        )
-
-        
+        for kind, ticker, payload in events:
+            if kind == "done":
+                watchlist.save_result(payload, score_full_text, local_only)
+                results[ticker] = payload
+            stream_ticker_event(kind, ticker, payload, slots[ticker])
 
-        st.markdown("---")
+    # Kept for the reruns that any other widget triggers
+    st.session_state["last_analysis"] = {
+        "tickers": tickers,
+        "results": results,
+        "analyzed_at": datetime.now(),
+    }
+    render_metrics()
 
-        # Row 2: Price & Sentiment Charts
-        st.subheader("Price Trends")
-
-        st.markdown("**Price Chart**")
-        if not hist.empty:
-                fig_price = px.line(hist, x="Date", y="Close", title=f"{ticker} Stock Price Over Time")
-                st.plotly_chart(fig_price, use_container_width=True)
-        else:
-                st.warning("No price data available.")
-
-
-        st.markdown("---")
-
-        # Row 3: News Cards
-        st.subheader("Recent News")
-        with st.spinner(f"Fetching news for {ticker}..."):
-            # Fetch news once
-            articles = rss_scraping.fetch_news(ticker)
-            
-            if not articles:
-                st.warning(f"No articles found for {ticker}.")
-            else:
-                # Display news cards
-                for article in articles:
-                    render_news_card(
-                        title=article.get("title", "No Title"),
-                        url=article.get("url", "#"),
-                        pub_date=article.get("published_at", "No Published Date"),
-                    )
-
-        st.markdown("---")
-
-        # Row 4: AI Analysis (Gemini + FinBERT)
-        st.subheader("AI Analysis")
-        
-        if articles:
-            # Process all 5 articles for comprehensive analysis
-            limited_articles = articles[:5]
-            st.info(f"🚀 Processing {len(limited_articles)} articles for comprehensive analysis...")
-            
-            # Create progress bar
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            
-            try:
-                # Step 1: Process articles with Gemini
-                status_text.text("🤖 Condensing articles with Gemini...")
-                progress_bar.progress(20)
-                
-                condensed_articles = process_articles_with_gemini(limited_articles)
-                progress_bar.progress(40)
-                
-                if condensed_articles:
-                    # Step 2: Run FinBERT analysis
-                    status_text.text("🧠 Analyzing sentiment with FinBERT...")
-                    progress_bar.progress(60)
-                    
-                    sentiment_result = calculate_final_sentiment_score(condensed_articles)
-                    progress_bar.progress(80)
-                    
-                    # Step 3: Generate market summary
-                    status_text.text("📊 Generating market summary...")
-                    market_summary = generate_market_summary(condensed_articles, ticker)
-                    progress_bar.progress(100)
-                    status_text.text("✅ Analysis complete!")
-                    
-                    # Display results
-                    st.success(f"✅ Analyzed {len(condensed_articles)} articles successfully!")
-                    
-                    # Enhanced Visual Sentiment Display
-                    st.subheader("📊 Market Sentiment Analysis")
-                    
-                    # Main sentiment display with multiple visual elements
-                    col1, col2, col3 = st.columns([2, 1, 1])
-                    
-                    with col1:
-                        # Large circular gauge with dynamic colors and emojis
-                        score = sentiment_result['final_score']
-                        color = get_sentiment_color(score)
-                        emoji = get_sentiment_emoji(score)
-                        
-                        # Create a more sophisticated gauge
-                        gauge_html = f"""
-                        <div style="
-                            display: flex;
-                            flex-direction: column;
-                            align-items: center;
-                            padding: 20px;
-                            background: linear-gradient(135deg, #1e1e1e 0%, #2d2d2d 100%);
-                            border-radius: 20px;
-                            box-shadow: 0 8px 32px rgba(0,0,0,0.3);
-                            border: 2px solid {color};
-                        ">
-                            <div style="
-                                width: 200px;
-                                height: 200px;
-                                border-radius: 50%;
-                                background: conic-gradient({color} 0deg, {color} {score * 3.6}deg, #333 {score * 3.6}deg, #333 360deg);
-                                display: flex;
-                                align-items: center;
-                                justify-content: center;
-                                position: relative;
-                                margin-bottom: 15px;
-                            ">
-                                <div style="
-                                    width: 160px;
-                                    height: 160px;
-                                    border-radius: 50%;
-                                    background: #1e1e1e;
-                                    display: flex;
-                                    flex-direction: column;
-                                    align-items: center;
-                                    justify-content: center;
-                                    font-family: 'Segoe UI', sans-serif;
-                                ">
-                                    <div style="font-size: 48px; margin-bottom: 5px;">{emoji}</div>
-                                    <div style="font-size: 32px; font-weight: bold; color: {color};">{score:.0f}</div>
-                                    <div style="font-size: 14px; color: #999;">/ 100</div>
-                                </div>
-                            </div>
-                            <div style="
-                                text-align: center;
-                                color: {color};
-                                font-size: 18px;
-                                font-weight: bold;
-                                margin-bottom: 5px;
-                            ">{sentiment_result['sentiment_label']}</div>
-                            <div style="
-                                text-align: center;
-                                color: #999;
-                                font-size: 14px;
-                            ">Market Sentiment Score</div>
-                        </div>
-                        """
-                        st.markdown(gauge_html, unsafe_allow_html=True)
-                    
-                    with col2:
-                        # Article breakdown with visual indicators
-                        st.markdown("### 📈 Article Breakdown")
-                        
-                        # Positive articles
-                        pos_color = "#4CAF50" if sentiment_result['positive_count'] > 0 else "#666"
-                        st.markdown(f"""
-                        <div style="
-                            background: {pos_color}20;
-                            border-left: 4px solid {pos_color};
-                            padding: 10px;
-                            margin: 5px 0;
-                            border-radius: 5px;
-                        ">
-                            <div style="color: {pos_color}; font-weight: bold;">📈 {sentiment_result['positive_count']} Positive</div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                        # Negative articles
-                        neg_color = "#F44336" if sentiment_result['negative_count'] > 0 else "#666"
-                        st.markdown(f"""
-                        <div style="
-                            background: {neg_color}20;
-                            border-left: 4px solid {neg_color};
-                            padding: 10px;
-                            margin: 5px 0;
-                            border-radius: 5px;
-                        ">
-                            <div style="color: {neg_color}; font-weight: bold;">📉 {sentiment_result['negative_count']} Negative</div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                        # Neutral articles
-                        neu_color = "#FF9800" if sentiment_result['neutral_count'] > 0 else "#666"
-                        st.markdown(f"""
-                        <div style="
-                            background: {neu_color}20;
-                            border-left: 4px solid {neu_color};
-                            padding: 10px;
-                            margin: 5px 0;
-                            border-radius: 5px;
-                        ">
-                            <div style="color: {neu_color}; font-weight: bold;">➡️ {sentiment_result['neutral_count']} Neutral</div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    with col3:
-                        # Confidence and analysis metrics
-                        st.markdown("### 🎯 Analysis Confidence")
-                        
-                        # Confidence progress bar
-                        confidence_pct = sentiment_result['confidence'] * 100
-                        conf_color = "#4CAF50" if confidence_pct >= 80 else "#FF9800" if confidence_pct >= 60 else "#F44336"
-                        
-                        st.markdown(f"""
-                        <div style="
-                            background: #333;
-                            border-radius: 10px;
-                            padding: 15px;
-                            margin: 10px 0;
-                        ">
-                            <div style="color: {conf_color}; font-size: 24px; font-weight: bold; text-align: center;">
-                                {confidence_pct:.1f}%
-                            </div>
-                            <div style="
-                                background: #555;
-                                border-radius: 5px;
-                                height: 8px;
-                                margin: 10px 0;
-                                overflow: hidden;
-                            ">
-                                <div style="
-                                    background: {conf_color};
-                                    height: 100%;
-                                    width: {confidence_pct}%;
-                                    transition: width 0.3s ease;
-                                "></div>
-                            </div>
-                            <div style="color: #999; font-size: 12px; text-align: center;">
-                                Analysis Confidence
-                            </div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                        # Total articles processed
-                        st.metric(
-                            label="Articles Analyzed",
-                            value=sentiment_result['total_articles'],
-                            delta="Total Processed"
-                        )
-                    
-                    # Display market summary
-                    st.subheader("Market Mood Summary")
-                    st.markdown(market_summary)
-                    
-                else:
-                    st.warning("⚠️ Could not condense articles for analysis")
-                    
-            except Exception as e:
-                st.error(f"Error in AI analysis: {e}")
-            finally:
-                # Clear progress indicators
-                progress_bar.empty()
-                status_text.empty()
-        else:
-            st.warning("No articles available for AI analysis.")
\ No newline at end of file
+elif "last_analysis" in st.session_state:
+    # Any widget interaction reruns the script; redraw the last analysis instead of a blank page
+    last_analysis = st.session_state["last_analysis"]
+    st.caption(f"Showing the analysis from {last_analysis['analyzed_at']:%H:%M:%S}. Click Analyze to refresh.")
+    for ticker in last_analysis["tickers"]:
+        if ticker in last_analysis["results"]:
+            with st.container():
+                render_ticker(ticker, last_analysis["results"][ticker], history_freq)
+    render_metrics()
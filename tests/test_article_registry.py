@@ -0,0 +1,86 @@
+import threading
+import pytest
+from backend.article_registry import ArticleRegistry, canonical_url
+
+
+@pytest.mark.parametrize('url', [
+    'https://www.example.com/markets/story/?utm_source=google&utm_medium=news',
+    'HTTPS://EXAMPLE.COM:443/markets/story#comments',
+    'https://example.com/markets/story?fbclid=abc&gclid=def&mc_cid=1&_ga=2',
+    'https://www.google.com/url?q=https://example.com/markets/story/?utm_campaign=feed&sa=U',
+])
+def test_tracking_variants_collapse(url):
+    assert canonical_url(url) == 'https://example.com/markets/story'
+
+
+@pytest.mark.parametrize('first, second', [
+    ('https://example.com:8443/story', 'https://example.com/story'),
+    ('https://example.com/story?page=2', 'https://example.com/story'),
+    ('https://example.com/markets/story', 'https://example.com/markets/other-story'),
+])
+def test_different_locations_stay_distinct(first, second):
+    assert canonical_url(first) != canonical_url(second)
+
+
+def test_default_http_port_and_blank_scheme_are_normalized():
+    assert canonical_url('http://Example.com:80/a/') == 'http://example.com/a'
+    assert canonical_url('//example.com/a') == 'https://example.com/a'
+
+
+def test_query_is_sorted_and_tracking_dropped():
+    assert (canonical_url('https://example.com/a?b=2&utm_source=x&a=1')
+            == canonical_url('https://example.com/a?a=1&b=2'))
+
+
+@pytest.mark.parametrize('first, second', [
+    ('https://example.com/article?id=12345', 'https://example.com/article?id=67890'),
+    ('https://example.com/news?cid=12345', 'https://example.com/news?cid=67890'),
+    ('https://example.com/article.php?src=story-1', 'https://example.com/article.php?src=story-2'),
+    ('https://example.com/view?source=a&ref=1', 'https://example.com/view?source=b&ref=1'),
+])
+def test_content_parameters_stay_distinct(first, second):
+    assert canonical_url(first) != canonical_url(second)
+
+
+def test_registry_computes_once_per_canonical_url():
+    registry = ArticleRegistry()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return 'text'
+
+    assert registry.get('extract', 'https://example.com/story?utm_source=a', compute) == 'text'
+    assert registry.get('extract', 'https://www.example.com/story/', compute) == 'text'
+    assert registry.get('extract', 'https://example.com/story?id=2', compute) == 'text'
+    assert len(calls) == 2
+    assert (registry.hits, registry.misses) == (1, 2)
+
+
+def test_registry_waits_for_work_in_flight():
+    registry = ArticleRegistry()
+    started, release = threading.Event(), threading.Event()
+    results = []
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return 'text'
+
+    owner = threading.Thread(target=lambda: results.append(registry.get('extract', 'https://example.com/a', slow)))
+    owner.start()
+    started.wait(5)
+    waiter = threading.Thread(target=lambda: results.append(
+        registry.get('extract', 'https://example.com/a', lambda: 'again')))
+    waiter.start()
+    release.set()
+    owner.join(5)
+    waiter.join(5)
+    assert results == ['text', 'text']
+
+
+def test_alias_shares_results_with_the_redirect_target():
+    registry = ArticleRegistry()
+    registry.get('extract', 'https://news.example.com/r/123', lambda: 'text')
+    registry.alias('https://news.example.com/r/123', 'https://example.com/story')
+    assert registry.get('extract', 'https://example.com/story?utm_source=rss', lambda: 'other') == 'text'
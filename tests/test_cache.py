@@ -0,0 +1,79 @@
+import pickle
+from types import SimpleNamespace
+import pytest
+from backend import cache
+
+VALUE = 'x' * 100
+ENTRY_BYTES = len(pickle.dumps(VALUE, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(tmp_path, monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(cache, 'CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(cache, 'CACHE_ENABLED', True)
+    monkeypatch.setattr(cache, '_conn', None)
+    monkeypatch.setattr(cache, '_total_bytes', 0)
+    monkeypatch.setattr(cache, 'time', SimpleNamespace(time=lambda: clock.now))
+    yield clock
+    if cache._conn is not None:
+        cache._conn.close()
+
+
+def stored_keys():
+    return sorted(key for (key,) in cache._conn.execute('SELECT key FROM entries'))
+
+
+def test_put_and_get():
+    cache.put('article', 'a', {'text': 'body'})
+    assert cache.get('article', 'a') == {'text': 'body'}
+    assert cache.get('article', 'missing', default='none') == 'none'
+    assert cache.get('condensed', 'a') is None
+
+
+def test_entries_expire_after_ttl(empty_cache):
+    cache.put('article', 'a', VALUE)
+    empty_cache.now += 60
+    assert cache.get('article', 'a', ttl=60) == VALUE
+    empty_cache.now += 1
+    assert cache.get('article', 'a', ttl=60) is None
+    # Expired entries are deleted, not just hidden
+    assert cache.get('article', 'a') is None
+    assert cache._total_bytes == 0
+
+
+def test_eviction_drops_least_recently_used_down_to_fraction_of_limit(empty_cache, monkeypatch):
+    monkeypatch.setattr(cache, 'CACHE_MAX_BYTES', 10 * ENTRY_BYTES)
+    for i in range(10):
+        empty_cache.now += 1
+        cache.put('article', f'k{i}', VALUE)
+    # Reading k0 makes it the most recently used
+    empty_cache.now += 1
+    cache.get('article', 'k0')
+
+    empty_cache.now += 1
+    cache.put('article', 'k10', VALUE)
+
+    assert cache._total_bytes <= cache.CACHE_MAX_BYTES * cache.EVICT_TO_FRACTION
+    assert cache._total_bytes == len(stored_keys()) * ENTRY_BYTES
+    assert stored_keys() == sorted(['k0', 'k10'] + [f'k{i}' for i in range(3, 10)])
+
+
+def test_replacing_an_entry_does_not_double_count():
+    cache.put('article', 'a', VALUE)
+    cache.put('article', 'a', VALUE)
+    assert cache._total_bytes == ENTRY_BYTES
+
+
+def test_clear_namespace():
+    cache.put('article', 'a', VALUE)
+    cache.put('metrics', 'a', VALUE)
+    cache.clear('metrics')
+    assert cache.get('metrics', 'a') is None
+    assert cache.get('article', 'a') == VALUE
+    assert cache._total_bytes == ENTRY_BYTES
+
+
+def test_text_hash_is_stable_and_separates_parts():
+    assert cache.text_hash('a', 'b') == cache.text_hash('a', 'b')
+    assert cache.text_hash('ab', '') != cache.text_hash('a', 'b')
@@ -0,0 +1,104 @@
+import math
+import random
+import threading
+import time
+from backend import dedup
+
+WIRE_STORY = (
+    "Nvidia reported record data center revenue on Wednesday, beating analyst estimates as demand "
+    "for its artificial intelligence chips continued to outstrip supply. The company guided "
+    "second quarter sales above expectations and announced a ten for one stock split."
+)
+
+
+def title_similarity(first, second):
+    return dedup.similarity(dedup.minhash(first, shingle_size=dedup.TITLE_SHINGLE_SIZE),
+                            dedup.minhash(second, shingle_size=dedup.TITLE_SHINGLE_SIZE))
+
+
+def test_identical_text_is_fully_similar():
+    assert dedup.similarity(dedup.minhash(WIRE_STORY), dedup.minhash(WIRE_STORY)) == 1.0
+
+
+def test_lightly_edited_copy_is_a_near_duplicate():
+    edited = WIRE_STORY.replace("on Wednesday", "Wednesday") + " Shares rose in late trading."
+    assert dedup.similarity(dedup.minhash(WIRE_STORY), dedup.minhash(edited)) >= dedup.TEXT_THRESHOLD
+
+
+def test_unrelated_text_is_distinct():
+    other = ("Apple unveiled a new line of laptops with in-house processors and said it would expand "
+             "its services business, sending the shares to a record close on Tuesday.")
+    assert dedup.similarity(dedup.minhash(WIRE_STORY), dedup.minhash(other)) < dedup.TEXT_THRESHOLD
+
+
+def test_opposite_headlines_stay_distinct():
+    assert title_similarity("Nvidia rises after analysts revise price targets",
+                            "Nvidia falls after analysts revise price targets") < dedup.TITLE_THRESHOLD
+
+
+def test_headline_with_outlet_punctuation_matches():
+    assert title_similarity("Nvidia rises after analysts revise price targets",
+                            "Nvidia Rises After Analysts Revise Price Targets!") >= dedup.TITLE_THRESHOLD
+
+
+def test_empty_text_has_no_signature():
+    assert dedup.minhash("") is None
+    assert dedup.similarity(None, dedup.minhash(WIRE_STORY)) == 0.0
+
+
+def test_cluster_weight_grows_with_log_of_size():
+    assert dedup.cluster_weight(1) == 1.0
+    assert dedup.cluster_weight(3) == 1.0 + math.log(3)
+    assert dedup.cluster_weight(0) == 1.0
+
+
+def test_cluster_articles_keeps_first_copy_in_input_order():
+    articles = [
+        {"title": "Nvidia beats estimates as data center sales soar", "url": "https://a.example/1"},
+        {"title": "Apple unveils new laptops with in-house chips", "url": "https://b.example/2"},
+        {"title": "Nvidia beats estimates as data center sales soar", "url": "https://c.example/3"},
+        {"title": "Nvidia falls after analysts revise price targets", "url": "https://d.example/4"},
+        {"title": "Nvidia beats estimates as data center sales soar", "url": "https://e.example/5"},
+    ]
+    clustered = dedup.cluster_articles(articles)
+
+    assert [article["url"] for article in clustered] == ["https://a.example/1", "https://b.example/2",
+                                                        "https://d.example/4"]
+    assert clustered[0]["cluster_size"] == 3
+    assert clustered[0]["duplicates"] == ["https://c.example/3", "https://e.example/5"]
+    assert clustered[1]["cluster_size"] == 1 and clustered[1]["duplicates"] == []
+
+
+def test_lowest_rank_is_representative_whatever_the_finishing_order():
+    signature = dedup.minhash(WIRE_STORY)
+    for _ in range(10):
+        index = dedup.DuplicateIndex()
+        returned = {}
+
+        def add(rank):
+            time.sleep(random.random() / 100)
+            returned[rank] = index.add(f"url-{rank}", signature, rank=rank)
+
+        threads = [threading.Thread(target=add, args=(rank,)) for rank in reversed(range(4))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        assert returned == {0: None, 1: "url-0", 2: "url-0", 3: "url-0"}
+        assert index.cluster_size("url-0") == 4
+
+
+def test_skipped_rank_does_not_hold_up_later_ranks():
+    signature = dedup.minhash(WIRE_STORY)
+    index = dedup.DuplicateIndex()
+    index.skip(0)
+    assert index.add("url-1", signature, rank=1, wait=1) is None
+    assert index.add("url-2", signature, rank=2, wait=1) == "url-1"
+
+
+def test_wait_for_missing_rank_is_bounded():
+    index = dedup.DuplicateIndex()
+    started = time.monotonic()
+    assert index.add("url-1", dedup.minhash(WIRE_STORY), rank=1, wait=0.05) is None
+    assert time.monotonic() - started < 1
@@ -0,0 +1,44 @@
+from datetime import date
+import pandas as pd
+import pytest
+from backend import market_data, price_store
+
+
+@pytest.fixture(autouse=True)
+def empty_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(price_store, 'PRICE_DIR', str(tmp_path))
+    monkeypatch.setattr(price_store, '_frames', {})
+    monkeypatch.setattr(price_store, '_coverage', {})
+    monkeypatch.setattr(price_store, '_coverage_mtimes', {})
+    monkeypatch.setattr(price_store, 'get_metrics', lambda ticker, fetch_metrics: {'market_cap': 1, 'volume': 2})
+
+
+def download(tickers, start, end):
+    index = pd.bdate_range(start, end, inclusive='left')
+    columns = pd.MultiIndex.from_product([tickers, ['Close', 'Volume']])
+    return pd.DataFrame(1.0, index=index, columns=columns)
+
+
+def test_one_ticker_failing_only_sets_its_error(monkeypatch):
+    get_missing_ranges = price_store.get_missing_ranges
+
+    def failing(ticker, start, end):
+        if ticker == 'BAD':
+            raise OSError('disk error')
+        return get_missing_ranges(ticker, start, end)
+
+    monkeypatch.setattr(price_store, 'get_missing_ranges', failing)
+    data = market_data.fetch_market_data(['AAA', 'BAD'], date(2024, 1, 1), date(2024, 1, 5), download=download)
+
+    assert data['AAA']['error'] is None
+    assert len(data['AAA']['hist']) == 5
+    assert isinstance(data['BAD']['error'], OSError)
+
+
+def test_failed_download_sets_every_stale_ticker_error():
+    def failing(tickers, start, end):
+        raise ConnectionError('offline')
+
+    data = market_data.fetch_market_data(['AAA', 'BBB'], date(2024, 1, 1), date(2024, 1, 5), download=failing)
+    assert all(isinstance(data[ticker]['error'], ConnectionError) for ticker in ('AAA', 'BBB'))
+    assert data['AAA']['hist'].empty
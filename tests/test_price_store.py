@@ -0,0 +1,108 @@
+import os
+from datetime import date, timedelta
+import pandas as pd
+import pytest
+from backend import price_store
+
+
+@pytest.fixture(autouse=True)
+def empty_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(price_store, 'PRICE_DIR', str(tmp_path))
+    monkeypatch.setattr(price_store, '_frames', {})
+    monkeypatch.setattr(price_store, '_coverage', {})
+    monkeypatch.setattr(price_store, '_coverage_mtimes', {})
+
+
+def bars(start, end, close=1.0):
+    index = pd.bdate_range(start, end)
+    return pd.DataFrame({'Close': close, 'Volume': 100}, index=index)
+
+
+def test_missing_ranges_without_coverage():
+    assert price_store.missing_ranges([], date(2024, 1, 1), date(2024, 1, 31)) == [(date(2024, 1, 1), date(2024, 1, 31))]
+
+
+def test_missing_ranges_around_coverage():
+    coverage = [(date(2024, 1, 5), date(2024, 1, 10)), (date(2024, 1, 20), date(2024, 1, 25))]
+    assert price_store.missing_ranges(coverage, date(2024, 1, 1), date(2024, 1, 31)) == [
+        (date(2024, 1, 1), date(2024, 1, 4)),
+        (date(2024, 1, 11), date(2024, 1, 19)),
+        (date(2024, 1, 26), date(2024, 1, 31)),
+    ]
+
+
+def test_missing_ranges_inside_coverage():
+    coverage = [(date(2024, 1, 1), date(2024, 1, 31))]
+    assert price_store.missing_ranges(coverage, date(2024, 1, 5), date(2024, 1, 10)) == []
+
+
+def test_today_is_never_covered():
+    today = date.today()
+    start = today - timedelta(days=10)
+    price_store.store_history('AAA', bars(start, today), start, today)
+    assert price_store.get_missing_ranges('AAA', start, today) == [(today, today)]
+
+
+def test_overlapping_downloads_merge():
+    price_store.store_history('AAA', bars('2024-01-01', '2024-01-12', close=1.0), date(2024, 1, 1), date(2024, 1, 12))
+    price_store.store_history('AAA', bars('2024-01-08', '2024-01-19', close=2.0), date(2024, 1, 8), date(2024, 1, 19))
+
+    assert price_store.get_missing_ranges('AAA', date(2024, 1, 1), date(2024, 1, 19)) == []
+    history = price_store.read_history('AAA', date(2024, 1, 1), date(2024, 1, 19))
+    assert list(history.index) == list(pd.bdate_range('2024-01-01', '2024-01-19'))
+    # The later download wins where they overlap
+    assert history.loc['2024-01-05', 'Close'] == 1.0
+    assert history.loc['2024-01-08', 'Close'] == 2.0
+
+
+def test_store_survives_reload():
+    price_store.store_history('AAA', bars('2024-01-01', '2024-01-05'), date(2024, 1, 1), date(2024, 1, 5))
+    price_store._frames.clear()
+    price_store._coverage.clear()
+
+    assert price_store.get_missing_ranges('AAA', date(2024, 1, 1), date(2024, 1, 5)) == []
+    assert len(price_store.read_history('AAA', date(2024, 1, 1), date(2024, 1, 5))) == 5
+
+
+def test_empty_download_of_trading_days_is_not_covered():
+    price_store.store_history('AAA', pd.DataFrame(), date(2024, 1, 1), date(2024, 1, 5))
+    assert price_store.get_missing_ranges('AAA', date(2024, 1, 1), date(2024, 1, 5)) == [(date(2024, 1, 1), date(2024, 1, 5))]
+
+    # A weekend has no bars to download
+    price_store.store_history('AAA', pd.DataFrame(), date(2024, 1, 6), date(2024, 1, 7))
+    assert price_store.get_missing_ranges('AAA', date(2024, 1, 6), date(2024, 1, 7)) == []
+
+
+def test_ticker_cannot_escape_the_store(tmp_path):
+    price_store.store_history('../AAA', bars('2024-01-01', '2024-01-05'), date(2024, 1, 1), date(2024, 1, 5))
+    for path in price_store._paths('../AAA'):
+        assert os.path.dirname(path) == str(tmp_path)
+    assert not os.path.exists(tmp_path.parent / 'AAA.parquet')
+
+
+def test_unreadable_files_count_as_no_coverage():
+    price_store.store_history('AAA', bars('2024-01-01', '2024-01-05'), date(2024, 1, 1), date(2024, 1, 5))
+    price_store._frames.clear()
+    data_path, coverage_path = price_store._paths('AAA')
+    with open(coverage_path, 'w') as f:
+        f.write('[["2024-01-01", "2024-')
+
+    assert price_store.get_missing_ranges('AAA', date(2024, 1, 1), date(2024, 1, 5)) == [(date(2024, 1, 1), date(2024, 1, 5))]
+    assert price_store.read_history('AAA', date(2024, 1, 1), date(2024, 1, 5)).empty
+
+
+def test_files_replaced_by_another_process_are_reloaded(tmp_path, monkeypatch):
+    price_store.store_history('AAA', bars('2024-01-01', '2024-01-05'), date(2024, 1, 1), date(2024, 1, 5))
+    loaded = price_store._frames, price_store._coverage, price_store._coverage_mtimes
+
+    # Another process sharing PRICE_DIR, with its own copy in memory, extends the stored history
+    monkeypatch.setattr(price_store, '_frames', {})
+    monkeypatch.setattr(price_store, '_coverage', {})
+    monkeypatch.setattr(price_store, '_coverage_mtimes', {})
+    price_store.store_history('AAA', bars('2024-01-08', '2024-01-12'), date(2024, 1, 6), date(2024, 1, 12))
+    for name, value in zip(('_frames', '_coverage', '_coverage_mtimes'), loaded):
+        monkeypatch.setattr(price_store, name, value)
+
+    assert price_store.get_missing_ranges('AAA', date(2024, 1, 1), date(2024, 1, 12)) == []
+    assert len(price_store.read_history('AAA', date(2024, 1, 1), date(2024, 1, 12))) == 10
+    assert sorted(os.listdir(tmp_path)) == ['AAA.json', 'AAA.parquet']
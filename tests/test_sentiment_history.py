@@ -0,0 +1,67 @@
+from datetime import datetime, timezone
+import pytest
+from backend import sentiment_history
+
+RECORDED_AT = datetime(2024, 3, 10, 12, tzinfo=timezone.utc).timestamp()
+POSITIVE = {'label': 'positive', 'raw_score': 0.8, 'confidence': 0.9}
+
+
+@pytest.fixture(autouse=True)
+def empty_history(tmp_path, monkeypatch):
+    monkeypatch.setattr(sentiment_history, 'HISTORY_PATH', str(tmp_path / 'history.sqlite3'))
+    monkeypatch.setattr(sentiment_history, 'HISTORY_ENABLED', True)
+    monkeypatch.setattr(sentiment_history, '_conn', None)
+    yield
+    if sentiment_history._conn is not None:
+        sentiment_history._conn.close()
+
+
+def article(**fields):
+    return {'url': 'https://example.com/story', 'title': 'Story', 'sentiment': POSITIVE, **fields}
+
+
+def stored_time():
+    return sentiment_history.load_articles('AAA')['timestamp'].tolist()
+
+
+@pytest.mark.parametrize('age, seconds', [
+    ('5 mins ago', 5 * 60),
+    ('1 minute ago', 60),
+    ('an hour ago', 3600),
+    ('3 hours ago', 3 * 3600),
+    ('3 days ago', 3 * 86400),
+    ('yesterday', 86400),
+    ('2 weeks ago', 14 * 86400),
+])
+def test_relative_ages(age, seconds):
+    assert sentiment_history._relative_epoch(age, RECORDED_AT) == RECORDED_AT - seconds
+
+
+def test_absolute_dates_are_not_relative():
+    assert sentiment_history._relative_epoch('Mar 7, 2024', RECORDED_AT) is None
+    assert sentiment_history._relative_epoch(None, RECORDED_AT) is None
+
+
+def test_relative_published_at_places_the_article():
+    sentiment_history.record('AAA', [article(published_at='3 days ago')], None, recorded_at=RECORDED_AT)
+    assert stored_time() == [datetime(2024, 3, 7, 12)]
+
+
+def test_later_publication_date_replaces_the_fallback_time():
+    sentiment_history.record('AAA', [article(published_at='')], None, recorded_at=RECORDED_AT)
+    assert stored_time() == [datetime(2024, 3, 10, 12)]
+
+    sentiment_history.record('AAA', [article(publish_date='2024-03-08T09:00:00')], None,
+                             recorded_at=RECORDED_AT + 3600)
+    assert stored_time() == [datetime(2024, 3, 8, 9)]
+
+
+def test_dated_rows_keep_their_first_time_and_score():
+    sentiment_history.record('AAA', [article(publish_date='2024-03-08T09:00:00')], None, recorded_at=RECORDED_AT)
+    sentiment_history.record(
+        'AAA', [article(publish_date='2024-03-09T09:00:00', sentiment={**POSITIVE, 'raw_score': -0.5})], None,
+        recorded_at=RECORDED_AT + 3600,
+    )
+    rows = sentiment_history.load_articles('AAA')
+    assert rows['timestamp'].tolist() == [datetime(2024, 3, 8, 9)]
+    assert rows['raw_score'].tolist() == [0.8]
@@ -0,0 +1,74 @@
+import queue
+import threading
+import pytest
+from backend import sentiment
+
+
+@pytest.fixture(autouse=True)
+def fake_model(monkeypatch):
+    calls = []
+
+    def analyze_articles(texts, chunked=False):
+        calls.append(list(texts))
+        return [{'label': 'neutral', 'text': text} for text in texts]
+
+    monkeypatch.setattr(sentiment, 'analyze_articles', analyze_articles)
+    monkeypatch.setattr(sentiment, '_batch_queue', queue.Queue())
+    monkeypatch.setattr(sentiment, '_batch_worker', None)
+    monkeypatch.setattr(sentiment, '_result_cache', sentiment.OrderedDict())
+    return calls
+
+
+def texts(*names):
+    return [f'{name} reported quarterly results today' for name in names]
+
+
+def test_results_come_back_in_input_order():
+    results = sentiment.analyze_articles_queued(texts('a', 'b', 'c'))
+    assert [result['text'] for result in results] == texts('a', 'b', 'c')
+
+
+def test_memoized_texts_skip_the_queue(fake_model):
+    key = sentiment._result_key(texts('a')[0])
+    sentiment._remember_result(key, {'label': 'positive'}, persist=False)
+
+    results = sentiment.analyze_articles_queued(texts('a', 'b'))
+    assert results[0] == {'label': 'positive'}
+    assert fake_model == [texts('b')]
+
+
+def test_dead_worker_is_restarted():
+    sentiment.analyze_articles_queued(texts('a'))
+    dead = threading.Thread(target=lambda: None)
+    dead.start()
+    dead.join()
+    sentiment._batch_worker = dead
+
+    assert sentiment.analyze_articles_queued(texts('b'))[0]['text'] == texts('b')[0]
+    assert sentiment._batch_worker is not dead and sentiment._batch_worker.is_alive()
+
+
+def test_stuck_queue_falls_back_to_scoring_directly(monkeypatch, fake_model):
+    # A worker that is alive but never serves the queue
+    stuck = threading.Event()
+    worker = threading.Thread(target=stuck.wait, daemon=True)
+    worker.start()
+    monkeypatch.setattr(sentiment, '_batch_worker', worker)
+    monkeypatch.setattr(sentiment, 'BATCH_RESULT_TIMEOUT', 0.05)
+    try:
+        assert sentiment.analyze_articles_queued(texts('a'))[0]['text'] == texts('a')[0]
+        assert fake_model == [texts('a')]
+        # The abandoned request is skipped once a worker gets to it
+        _, _, future = sentiment._batch_queue.get_nowait()
+        assert future.cancelled()
+    finally:
+        stuck.set()
+
+
+def test_batch_errors_reach_every_caller(monkeypatch):
+    def failing(texts, chunked=False):
+        raise RuntimeError('model failed')
+
+    monkeypatch.setattr(sentiment, 'analyze_articles', failing)
+    with pytest.raises(RuntimeError):
+        sentiment.analyze_articles_queued(texts('a'))